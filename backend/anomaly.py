@@ -1,24 +1,294 @@
-import pandas as pd
+import json
+import os
+import time
+import numpy as np
+from backend import api_client
+from backend.tail_reader import get_reader
 
-rolling_stats = {}
+class RollingAnomalyDetector:
+    """
+    Per-home rolling mean/std detector with O(1) updates.
 
-def is_anomaly(home_id, value, window=50, threshold=2.5):
-    if home_id not in rolling_stats:
-        rolling_stats[home_id] = []
+    Each home gets a row in a preallocated ring buffer plus a running sum and
+    sum of squares, so a reading costs the same regardless of window size.
+    A reading is flagged when it falls outside mean ± threshold * std of the
+    window that includes it.
+
+    Memory is bounded by `max_homes` (least recently updated homes are evicted
+    in blocks) and `ttl` (homes idle for longer are dropped). With
+    `snapshot_path` set, state is written to disk every `snapshot_interval`
+    seconds and can be reloaded with `RollingAnomalyDetector.restore`.
+    """
+
+    # Readings per vectorized step in update_many (bounds the gathered windows to CHUNK x window)
+    CHUNK = 8192
+
+    def __init__(self, window=50, threshold=2.5, capacity=1024, max_homes=None, ttl=None,
+                 snapshot_path=None, snapshot_interval=300):
+        self.window = window
+        self.threshold = threshold
+        self.max_homes = max_homes
+        self.ttl = ttl
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        capacity = min(capacity, max_homes) if max_homes else capacity
+
+        self._index = {}
+        self._homes = [None] * capacity
+        self._free = []
+        self._next_row = 0
+        self._tick = 0
+        self._buffer = np.zeros((capacity, window))
+        self._pos = np.zeros(capacity, dtype=np.int64)
+        self._count = np.zeros(capacity, dtype=np.int64)
+        self._sum = np.zeros(capacity)
+        self._sumsq = np.zeros(capacity)
+        self._last_tick = np.zeros(capacity, dtype=np.int64)
+        self._last_seen = np.zeros(capacity)
+        self._last_sweep = time.time()
+        self._last_snapshot = time.time()
+        self.evictions = 0
+
+    def _grow(self, capacity):
+        extra = capacity - len(self._pos)
+        self._homes.extend([None] * extra)
+        self._buffer = np.vstack([self._buffer, np.zeros((extra, self.window))])
+        self._pos = np.concatenate([self._pos, np.zeros(extra, dtype=np.int64)])
+        self._count = np.concatenate([self._count, np.zeros(extra, dtype=np.int64)])
+        self._sum = np.concatenate([self._sum, np.zeros(extra)])
+        self._sumsq = np.concatenate([self._sumsq, np.zeros(extra)])
+        self._last_tick = np.concatenate([self._last_tick, np.zeros(extra, dtype=np.int64)])
+        self._last_seen = np.concatenate([self._last_seen, np.zeros(extra)])
+
+    def _evict(self, rows):
+        for row in rows:
+            del self._index[self._homes[row]]
+            self._homes[row] = None
+        self._count[rows] = 0
+        self._pos[rows] = 0
+        self._sum[rows] = 0.0
+        self._sumsq[rows] = 0.0
+        self._free.extend(int(r) for r in rows)
+        self.evictions += len(rows)
+
+    def _evict_lru(self):
+        # Evict the oldest ~10% of homes not touched by the current call
+        active = np.array(list(self._index.values()), dtype=np.int64)
+        candidates = active[self._last_tick[active] < self._tick]
+        if not len(candidates):
+            raise ValueError(f"A single batch touched more than max_homes={self.max_homes} homes")
+        k = min(len(candidates), max(1, self.max_homes // 10))
+        self._evict(candidates[np.argpartition(self._last_tick[candidates], k - 1)[:k]])
+
+    def _new_row(self):
+        if not self._free and self.max_homes and len(self._index) >= self.max_homes:
+            self._evict_lru()
+        if self._free:
+            return self._free.pop()
+        if self._next_row >= len(self._pos):
+            capacity = max(2 * len(self._pos), 1)
+            self._grow(min(capacity, self.max_homes) if self.max_homes else capacity)
+        self._next_row += 1
+        return self._next_row - 1
+
+    def _rows(self, home_ids):
+        # Rejected before any home is indexed, so a failed call leaves the detector unchanged
+        if self.max_homes and len(home_ids) > self.max_homes and len(set(home_ids)) > self.max_homes:
+            raise ValueError(f"A single batch touched more than max_homes={self.max_homes} homes")
+        self._tick += 1
+        now = time.time()
+        rows = np.empty(len(home_ids), dtype=np.int64)
+        for i, home_id in enumerate(home_ids):
+            row = self._index.get(home_id)
+            if row is None:
+                row = self._new_row()
+                self._index[home_id] = row
+                self._homes[row] = home_id
+            # mark as touched now so a later new home in this batch cannot evict it
+            self._last_tick[row] = self._tick
+            rows[i] = row
+        self._last_seen[rows] = now
+        return rows
+
+    def _maintain(self):
+        now = time.time()
+        if self.ttl and now - self._last_sweep >= min(self.ttl, 60):
+            self.evict_idle(now)
+        if self.snapshot_path and now - self._last_snapshot >= self.snapshot_interval:
+            self.snapshot(self.snapshot_path)
+
+    def _update_rows(self, rows, values):
+        # `rows` must be unique: each home advances by exactly one reading
+        pos = self._pos[rows]
+        evicted = np.where(self._count[rows] >= self.window, self._buffer[rows, pos], 0.0)
+        self._buffer[rows, pos] = values
+        self._sum[rows] += values - evicted
+        self._sumsq[rows] += values ** 2 - evicted ** 2
+        self._count[rows] += 1
+        self._pos[rows] = (pos + 1) % self.window
+
+        # Re-sum once per full lap to stop floating-point drift (amortised O(1))
+        wrapped = rows[self._pos[rows] == 0]
+        if len(wrapped):
+            self._sum[wrapped] = self._buffer[wrapped].sum(axis=1)
+            self._sumsq[wrapped] = (self._buffer[wrapped] ** 2).sum(axis=1)
 
-    values = rolling_stats[home_id]
-    values.append(value)
+        n = np.minimum(self._count[rows], self.window)
+        mean = self._sum[rows] / n
+        std = np.sqrt(np.maximum(self._sumsq[rows] / n - mean ** 2, 0.0))
+        return (values < mean - self.threshold * std) | (values > mean + self.threshold * std)
 
-    if len(values) > window:
-        values.pop(0)
+    def update(self, home_id, value):
+        flag = bool(self._update_rows(self._rows([home_id]), np.array([float(value)]))[0])
+        self._maintain()
+        return flag
 
-    mean = sum(values) / len(values)
-    std = (sum((v - mean) ** 2 for v in values) / len(values)) ** 0.5
-    lower, upper = mean - threshold * std, mean + threshold * std
+    def update_many(self, home_ids, values):
+        """
+        Processes a batch of readings across homes in arrival order and returns a
+        boolean array of anomaly flags, identical to calling update() per reading.
 
-    return value < lower or value > upper
+        Each home's window so far and its new readings are laid out as one segment,
+        and every reading's window is gathered from that segment in one vectorized
+        step (in chunks of CHUNK readings), so the cost is O((readings + homes) * window)
+        however the batch is spread across homes; a burst from one home is as cheap as
+        the same number of readings spread over many.
+        """
+        values = np.asarray(values, dtype=float)
+        rows = self._rows(list(home_ids))
+        flags = np.zeros(len(rows), dtype=bool)
+        if not len(rows):
+            return flags
+        w = self.window
+        cols = np.arange(w)
+
+        order = np.argsort(rows, kind="stable")
+        homes, first, new = np.unique(rows[order], return_index=True, return_counts=True)
+        held = np.minimum(self._count[homes], w)
+        # Each home's ring buffer in chronological order; the last `held` columns are its window
+        ring = self._buffer[homes[:, None], (self._pos[homes][:, None] + cols) % w]
+
+        seg_len = held + new
+        seg_start = np.r_[0, np.cumsum(seg_len)[:-1]]
+        x = np.empty(seg_len.sum())
+        in_window = cols >= (w - held)[:, None]
+        x[((seg_start - w + held)[:, None] + cols)[in_window]] = ring[in_window]
+        group = np.repeat(np.arange(len(homes)), new)
+        at = seg_start[group] + held[group] + np.arange(len(rows)) - np.repeat(first, new)
+        x[at] = values[order]
+
+        # Gather each reading's window (itself and up to w - 1 earlier values of its home) in chunks
+        lo = np.maximum(seg_start[group], at - w + 1)
+        sorted_flags = np.empty(len(rows), dtype=bool)
+        for c in range(0, len(at), self.CHUNK):
+            end, start = at[c:c + self.CHUNK], lo[c:c + self.CHUNK]
+            idx = end[:, None] - cols[::-1]
+            valid = idx >= start[:, None]
+            win = np.where(valid, x[np.maximum(idx, 0)], 0.0)
+            n = valid.sum(axis=1)
+            mean = win.sum(axis=1) / n
+            std = np.sqrt(np.maximum((win ** 2).sum(axis=1) / n - mean ** 2, 0.0))
+            v = x[end]
+            sorted_flags[c:c + self.CHUNK] = (v < mean - self.threshold * std) | (v > mean + self.threshold * std)
+        flags[order] = sorted_flags
+
+        # New state: the last `w` values of each segment, oldest first from column 0
+        kept = np.minimum(seg_len, w)
+        filled = cols < kept[:, None]
+        source = np.where(filled, (seg_start + seg_len - kept)[:, None] + cols, 0)
+        window = np.where(filled, x[source], 0.0)
+        self._buffer[homes] = window
+        self._pos[homes] = kept % w
+        self._count[homes] += new
+        self._sum[homes] = window.sum(axis=1)
+        self._sumsq[homes] = (window ** 2).sum(axis=1)
+        self._maintain()
+        return flags
+
+    def stats(self, home_id):
+        row = self._index[home_id]
+        n = min(self._count[row], self.window)
+        mean = float(self._sum[row] / n)
+        return {"count": int(n), "mean": mean, "std": max(float(self._sumsq[row] / n) - mean ** 2, 0.0) ** 0.5}
+
+    def evict_idle(self, now=None):
+        """
+        Drops homes that have not reported for longer than `ttl` seconds. Returns how many were evicted.
+        """
+        now = now or time.time()
+        self._last_sweep = now
+        if not self.ttl or not self._index:
+            return 0
+        active = np.array(list(self._index.values()), dtype=np.int64)
+        idle = active[now - self._last_seen[active] > self.ttl]
+        self._evict(idle)
+        return len(idle)
+
+    def memory_usage(self):
+        arrays = [self._buffer, self._pos, self._count, self._sum, self._sumsq, self._last_tick, self._last_seen]
+        nbytes = sum(a.nbytes for a in arrays)
+        return {
+            "homes": len(self._index),
+            "capacity": len(self._pos),
+            "evictions": self.evictions,
+            "bytes": nbytes,
+            "bytes_per_home": nbytes / len(self._pos) if len(self._pos) else 0,
+        }
+
+    def snapshot(self, path):
+        """
+        Writes the state of every tracked home to `path` (.npz), atomically.
+        """
+        homes = list(self._index)
+        rows = np.array([self._index[h] for h in homes], dtype=np.int64)
+        meta = {"window": self.window, "threshold": self.threshold,
+                "homes": [h.item() if isinstance(h, np.generic) else h for h in homes]}
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f, meta=np.array(json.dumps(meta)), buffer=self._buffer[rows], pos=self._pos[rows],
+                count=self._count[rows], sum=self._sum[rows], sumsq=self._sumsq[rows],
+                last_seen=self._last_seen[rows],
+            )
+        os.replace(tmp_path, path)
+        self._last_snapshot = time.time()
+
+    @classmethod
+    def restore(cls, path, **kwargs):
+        """
+        Builds a detector from a snapshot so homes resume with a warm window.
+        Extra keyword arguments (max_homes, ttl, snapshot_path, ...) configure the new instance.
+        """
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            homes = meta["homes"]
+            detector = cls(window=meta["window"], threshold=meta["threshold"],
+                           capacity=max(len(homes), 1), **kwargs)
+            if detector.max_homes and len(homes) > detector.max_homes:
+                raise ValueError(f"Snapshot has {len(homes)} homes, more than max_homes={detector.max_homes}")
+            n = len(homes)
+            detector._buffer[:n] = data["buffer"]
+            detector._pos[:n] = data["pos"]
+            detector._count[:n] = data["count"]
+            detector._sum[:n] = data["sum"]
+            detector._sumsq[:n] = data["sumsq"]
+            detector._last_seen[:n] = data["last_seen"]
+        detector._index = {home: row for row, home in enumerate(homes)}
+        detector._homes[:n] = homes
+        detector._next_row = n
+        return detector
+
+rolling_stats = {}
+
+def is_anomaly(home_id, value, window=50, threshold=2.5):
+    key = (window, threshold)
+    if key not in rolling_stats:
+        rolling_stats[key] = RollingAnomalyDetector(window=window, threshold=threshold)
+    return rolling_stats[key].update(home_id, value)
 
 def load_anomaly_results(path="decrypted/anomaly_results.csv"):
-    df = pd.read_csv(path)
-    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    if api_client.API_URL:
+        return api_client.fetch_readings()[["timestamp", "home_id", "energy_kwh", "is_anomaly"]]
+    # Only rows appended since the last call are parsed
+    df = get_reader(path, dtypes={"home_id": str}).read()
     return df[["timestamp", "home_id", "energy_kwh", "is_anomaly"]]
@@ -0,0 +1,318 @@
+# --- backend/api.py ---
+
+import io
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+import numpy as np
+import pandas as pd
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from backend.anomaly import RollingAnomalyDetector
+from backend.api_client import BINARY_DTYPE
+from backend.ingestion import train_synthetic_model, EPSILON
+from backend.privacy import laplace_mechanism
+
+COLUMNS = ["timestamp", "home_id", "energy_kwh", "noisy_kwh", "is_anomaly", "is_anomaly_ml"]
+# Memory bounds: readings kept per home (one week of minutes) and homes kept in the index/detector
+MAX_ROWS_PER_HOME = int(os.environ.get("SEER_API_MAX_ROWS", 10080))
+MAX_HOMES = int(os.environ.get("SEER_API_MAX_HOMES", 2000))
+# Optional .npz snapshot so detector windows survive restarts
+DETECTOR_SNAPSHOT = os.environ.get("SEER_DETECTOR_SNAPSHOT")
+
+logger = logging.getLogger(__name__)
+
+class HomeSeries:
+    """
+    Column arrays for one home, kept sorted by timestamp for range queries.
+
+    Only the newest `max_rows` readings are visible. Storage grows to twice that
+    and is then compacted back to the newest `max_rows`, so appends stay amortised O(1).
+    """
+
+    FIELDS = ("timestamp", "energy_kwh", "noisy_kwh", "is_anomaly", "is_anomaly_ml")
+
+    def __init__(self, capacity=1024, max_rows=MAX_ROWS_PER_HOME):
+        self.max_rows = max_rows
+        self.size = 0
+        self.sorted = True
+        capacity = min(capacity, 2 * max_rows)
+        self.timestamp = np.empty(capacity, dtype=np.int64)
+        self.energy_kwh = np.empty(capacity)
+        self.noisy_kwh = np.empty(capacity)
+        self.is_anomaly = np.empty(capacity, dtype=bool)
+        self.is_anomaly_ml = np.empty(capacity, dtype=bool)
+
+    def __len__(self):
+        return min(self.size, self.max_rows)
+
+    def _compact(self, keep):
+        if not self.sorted:
+            self._sort()
+        for name in self.FIELDS:
+            column = getattr(self, name)
+            column[:keep] = column[self.size - keep:self.size]
+        self.size = keep
+
+    def append(self, **columns):
+        n = len(columns["timestamp"])
+        if n > self.max_rows:
+            columns = {name: columns[name][n - self.max_rows:] for name in self.FIELDS}
+            n = self.max_rows
+        if self.size + n > 2 * self.max_rows:
+            self._compact(self.max_rows - n)
+        if self.size + n > len(self.timestamp):
+            capacity = min(max(2 * len(self.timestamp), self.size + n), 2 * self.max_rows)
+            for name in self.FIELDS:
+                grown = np.empty(capacity, dtype=getattr(self, name).dtype)
+                grown[:self.size] = getattr(self, name)[:self.size]
+                setattr(self, name, grown)
+        out_of_order = self.size and columns["timestamp"][0] < self.timestamp[self.size - 1]
+        if out_of_order or np.any(np.diff(columns["timestamp"]) < 0):
+            self.sorted = False
+        for name in self.FIELDS:
+            getattr(self, name)[self.size:self.size + n] = columns[name]
+        self.size += n
+
+    def _sort(self):
+        order = np.argsort(self.timestamp[:self.size], kind="stable")
+        for name in self.FIELDS:
+            getattr(self, name)[:self.size] = getattr(self, name)[:self.size][order]
+        self.sorted = True
+
+    def query(self, start=None, end=None):
+        if not self.sorted:
+            self._sort()
+        first = self.size - len(self)
+        ts = self.timestamp[first:self.size]
+        lo = first + (np.searchsorted(ts, start, side="left") if start is not None else 0)
+        hi = first + (np.searchsorted(ts, end, side="right") if end is not None else len(ts))
+        return {name: getattr(self, name)[lo:hi].copy() for name in self.FIELDS}
+
+def epoch_ns(timestamps):
+    """
+    ISO 8601 timestamps (any mix of precisions and UTC offsets; naive ones are taken
+    as UTC) or datetime64 values as int64 nanoseconds since the epoch, in UTC.
+    Raises ValueError for anything unparseable or missing.
+    """
+    index = pd.DatetimeIndex(pd.to_datetime(timestamps, format="ISO8601", utc=True))
+    if index.hasnans:
+        raise ValueError("Missing timestamp")
+    return index.tz_convert(None).as_unit("ns").asi8
+
+def load_anomaly_model():
+    """
+    IsolationForest trained like streaming.py does, on noisy readings from the
+    household dataset. Without the dataset it falls back to a model trained on
+    synthetic readings and logs a warning. Returns (model, source).
+    """
+    from backend.streaming import INPUT_FILE, load_dataset, train_anomaly_model
+
+    if os.path.exists(INPUT_FILE):
+        return train_anomaly_model(load_dataset(INPUT_FILE)), "dataset"
+    logger.warning("%s not found: is_anomaly_ml comes from an IsolationForest trained on SYNTHETIC "
+                   "readings, not real meter data", INPUT_FILE)
+    return train_synthetic_model(), "synthetic"
+
+class ReadingService:
+    """
+    Runs posted batches through the privacy/anomaly pipeline (vectorized Laplace noise,
+    rolling z-score detector, IsolationForest on the noisy values) and keeps the
+    results in a per-home in-memory index for time-range queries.
+
+    Memory is bounded: each home keeps its newest `max_rows_per_home` readings, and
+    once `max_homes` homes are tracked the least recently updated one is dropped
+    (the detector evicts on the same bound).
+    """
+
+    def __init__(self, model=None, epsilon=EPSILON, sinks=None, max_rows_per_home=MAX_ROWS_PER_HOME,
+                 max_homes=MAX_HOMES, detector_snapshot=DETECTOR_SNAPSHOT):
+        if model is None:
+            model, self.model_source = load_anomaly_model()
+        else:
+            self.model_source = "provided"
+        self.model = model
+        self.epsilon = epsilon
+        self.max_rows_per_home = max_rows_per_home
+        self.max_homes = max_homes
+        if detector_snapshot and os.path.exists(detector_snapshot):
+            self.detector = RollingAnomalyDetector.restore(detector_snapshot, max_homes=max_homes,
+                                                           snapshot_path=detector_snapshot)
+        else:
+            self.detector = RollingAnomalyDetector(max_homes=max_homes, snapshot_path=detector_snapshot)
+        self.sinks = sinks or []
+        self.homes = {}
+        self.lock = threading.Lock()
+        self.readings = 0
+        self.batches = 0
+        self.busy = 0.0
+        self.rng = np.random.default_rng()
+
+    def ingest(self, home_ids, timestamps, values):
+        start = time.perf_counter()
+        home_ids = np.asarray(home_ids).astype(str)
+        timestamps = epoch_ns(timestamps)
+        values = np.asarray(values, dtype=float)
+        if not len(home_ids) == len(timestamps) == len(values):
+            raise ValueError("home_id, timestamp and energy_kwh must have the same length")
+        # Checked up front so a rejected batch leaves the detector and the index untouched
+        if self.max_homes and len(np.unique(home_ids)) > self.max_homes:
+            raise ValueError(f"A batch may touch at most max_homes={self.max_homes} homes")
+        noisy = np.maximum(0, laplace_mechanism(values, self.epsilon, rng=self.rng))
+        is_anomaly_ml = self.model.predict(pd.DataFrame({"noisy_kwh": noisy})) == -1
+
+        with self.lock:
+            is_anomaly = self.detector.update_many(home_ids, values)
+            order = np.argsort(home_ids, kind="stable")
+            homes, first = np.unique(home_ids[order], return_index=True)
+            for home, rows in zip(homes, np.split(order, first[1:])):
+                # Re-insert so dict order runs from least to most recently updated
+                series = self.homes.pop(home, None) or HomeSeries(max_rows=self.max_rows_per_home)
+                self.homes[home] = series
+                series.append(
+                    timestamp=timestamps[rows], energy_kwh=values[rows], noisy_kwh=noisy[rows],
+                    is_anomaly=is_anomaly[rows], is_anomaly_ml=is_anomaly_ml[rows],
+                )
+            while len(self.homes) > self.max_homes:
+                del self.homes[next(iter(self.homes))]
+            self.readings += len(values)
+            self.batches += 1
+            self.busy += time.perf_counter() - start
+
+        if self.sinks:
+            rows = pd.DataFrame({
+                "timestamp": pd.to_datetime(timestamps).strftime("%Y-%m-%d %H:%M:%S"),
+                "home_id": home_ids, "energy_kwh": np.round(values, 2), "noisy_kwh": np.round(noisy, 2),
+                "is_anomaly": is_anomaly, "is_anomaly_ml": is_anomaly_ml,
+            })
+            for sink in self.sinks:
+                sink.write(rows)
+        return {"accepted": int(len(values)), "anomalies": int(is_anomaly_ml.sum())}
+
+    def query(self, home_id=None, start=None, end=None, limit=None):
+        start = epoch_ns([start])[0] if start is not None else None
+        end = epoch_ns([end])[0] if end is not None else None
+        with self.lock:
+            homes = [home_id] if home_id is not None else sorted(self.homes)
+            frames = []
+            for home in homes:
+                if home not in self.homes:
+                    continue
+                columns = self.homes[home].query(start, end)
+                frame = pd.DataFrame(columns)
+                frame.insert(1, "home_id", home)
+                frames.append(frame)
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=COLUMNS)
+        df["timestamp"] = pd.to_datetime(df["timestamp"].astype("int64"))
+        if home_id is None and len(frames) > 1:
+            df = df.sort_values("timestamp", kind="stable", ignore_index=True)
+        return df.tail(limit) if limit else df
+
+class Reading(BaseModel):
+    home_id: str
+    timestamp: str
+    energy_kwh: float
+
+class ReadingBatch(BaseModel):
+    readings: list[Reading]
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_service():
+    """The process-wide ReadingService, created (and its model trained) on first use."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = ReadingService()
+        return _service
+
+@asynccontextmanager
+async def lifespan(app):
+    # Build the service at startup so the first request does not pay for model training
+    await run_in_threadpool(get_service)
+    yield
+    if _service is not None and _service.detector.snapshot_path:
+        _service.detector.snapshot(_service.detector.snapshot_path)
+
+app = FastAPI(title="SEER ingestion and query service", lifespan=lifespan)
+
+def _records(df):
+    return Response(df.to_json(orient="records", date_format="iso"), media_type="application/json")
+
+def _query(service, home_id, start, end, limit):
+    try:
+        return _records(service.query(home_id, start, end, limit))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid time range: {e}")
+
+@app.post("/readings")
+def post_readings(batch: ReadingBatch, service: ReadingService = Depends(get_service)):
+    if not batch.readings:
+        return {"accepted": 0, "anomalies": 0}
+    try:
+        return service.ingest(
+            [r.home_id for r in batch.readings], [r.timestamp for r in batch.readings],
+            [r.energy_kwh for r in batch.readings],
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid batch: {e}")
+
+@app.post("/readings/ndjson")
+async def post_readings_ndjson(request: Request, service: ReadingService = Depends(get_service)):
+    # One JSON object per line: {"home_id": ..., "timestamp": ..., "energy_kwh": ...}
+    body = await request.body()
+    if not body.strip():
+        return {"accepted": 0, "anomalies": 0}
+    try:
+        df = pd.read_json(io.BytesIO(body), lines=True, dtype={"home_id": str})
+        return await run_in_threadpool(service.ingest, df["home_id"], df["timestamp"], df["energy_kwh"])
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid NDJSON batch: {e}")
+
+@app.post("/homes/{home_id}/readings/binary")
+async def post_readings_binary(home_id: str, request: Request, service: ReadingService = Depends(get_service)):
+    # Body: packed BINARY_DTYPE records (int64 epoch-ns timestamp, float32 kWh), 12 bytes per reading
+    body = await request.body()
+    if len(body) % BINARY_DTYPE.itemsize:
+        raise HTTPException(status_code=400, detail=f"Body must be a multiple of {BINARY_DTYPE.itemsize} bytes")
+    records = np.frombuffer(body, dtype=BINARY_DTYPE)
+    if not len(records):
+        return {"accepted": 0, "anomalies": 0}
+    try:
+        return await run_in_threadpool(service.ingest, np.full(len(records), home_id),
+                                       records["timestamp"].astype("datetime64[ns]"), records["energy_kwh"])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid binary batch: {e}")
+
+@app.get("/homes")
+def get_homes(service: ReadingService = Depends(get_service)):
+    with service.lock:
+        return {home: len(series) for home, series in sorted(service.homes.items())}
+
+@app.get("/homes/{home_id}/readings")
+def get_home_readings(home_id: str, start: str = None, end: str = None, limit: int = None,
+                      service: ReadingService = Depends(get_service)):
+    with service.lock:
+        known = home_id in service.homes
+    if not known:
+        raise HTTPException(status_code=404, detail=f"Unknown home: {home_id}")
+    return _query(service, home_id, start, end, limit)
+
+@app.get("/readings")
+def get_readings(start: str = None, end: str = None, limit: int = None,
+                 service: ReadingService = Depends(get_service)):
+    return _query(service, None, start, end, limit)
+
+@app.get("/stats")
+def get_stats(service: ReadingService = Depends(get_service)):
+    return {
+        "homes": len(service.homes),
+        "model": service.model_source,
+        "readings": service.readings,
+        "batches": service.batches,
+        "pipeline_readings_per_sec": round(service.readings / service.busy, 1) if service.busy else 0.0,
+    }
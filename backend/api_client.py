@@ -0,0 +1,36 @@
+# --- backend/api_client.py ---
+
+import json
+import os
+import urllib.parse
+import urllib.request
+import numpy as np
+import pandas as pd
+
+# When set (e.g. http://127.0.0.1:8000), pages query the ingestion service instead of reading CSVs
+API_URL = os.environ.get("SEER_API_URL")
+TIMEOUT = 10
+# Compact bulk format for POST /homes/{home_id}/readings/binary: packed little-endian records
+BINARY_DTYPE = np.dtype([("timestamp", "<i8"), ("energy_kwh", "<f4")])
+
+def _get(path, base_url=None, **params):
+    query = urllib.parse.urlencode({k: v for k, v in params.items() if v is not None})
+    url = f"{(base_url or API_URL).rstrip('/')}{path}" + (f"?{query}" if query else "")
+    with urllib.request.urlopen(url, timeout=TIMEOUT) as response:
+        return json.load(response)
+
+def fetch_readings(home_id=None, start=None, end=None, limit=None, base_url=None):
+    """Readings with privacy/anomaly columns for one home (or all homes) in [start, end]."""
+    path = f"/homes/{urllib.parse.quote(home_id)}/readings" if home_id else "/readings"
+    df = pd.DataFrame(_get(path, base_url, start=start, end=end, limit=limit),
+                      columns=["timestamp", "home_id", "energy_kwh", "noisy_kwh", "is_anomaly", "is_anomaly_ml"])
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    return df
+
+def post_readings(df, base_url=None):
+    """Posts a DataFrame of home_id/timestamp/energy_kwh rows as one NDJSON batch."""
+    body = df[["home_id", "timestamp", "energy_kwh"]].to_json(orient="records", lines=True, date_format="iso")
+    request = urllib.request.Request(f"{(base_url or API_URL).rstrip('/')}/readings/ndjson", data=body.encode(),
+                                     headers={"Content-Type": "application/x-ndjson"}, method="POST")
+    with urllib.request.urlopen(request, timeout=TIMEOUT) as response:
+        return json.load(response)
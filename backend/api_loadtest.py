@@ -0,0 +1,101 @@
+# --- backend/api_loadtest.py ---
+
+import argparse
+import json
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from backend.api_client import BINARY_DTYPE
+
+P50_TARGET_MS = 100.0
+P99_TARGET_MS = 500.0
+
+def _request(url, data=None, content_type=None):
+    request = urllib.request.Request(url, data=data, method="POST" if data is not None else "GET")
+    if content_type:
+        request.add_header("Content-Type", content_type)
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=30) as response:
+        response.read()
+    return time.perf_counter() - start
+
+def _worker(base_url, worker_id, requests, batch_size, homes, seed):
+    rng = np.random.default_rng(seed)
+    latencies = {"post_ndjson": [], "post_binary": [], "query_home": []}
+    clock = pd.Timestamp("2025-01-01") + pd.Timedelta(minutes=worker_id * requests * batch_size)
+    for i in range(requests):
+        timestamps = clock + pd.to_timedelta(np.arange(batch_size), unit="min")
+        clock = timestamps[-1] + pd.Timedelta(minutes=1)
+        home = f"home_{rng.integers(homes):04d}"
+        values = rng.uniform(0.005, 0.05, batch_size)
+        kind = i % 3
+        if kind == 0:
+            rows = pd.DataFrame({"home_id": rng.integers(homes, size=batch_size), "timestamp": timestamps, "energy_kwh": values})
+            rows["home_id"] = rows["home_id"].map(lambda h: f"home_{h:04d}")
+            body = rows.to_json(orient="records", lines=True, date_format="iso").encode()
+            latencies["post_ndjson"].append(_request(f"{base_url}/readings/ndjson", body, "application/x-ndjson"))
+        elif kind == 1:
+            records = np.zeros(batch_size, dtype=BINARY_DTYPE)
+            records["timestamp"] = timestamps.to_numpy(dtype="datetime64[ns]").view("i8")
+            records["energy_kwh"] = values
+            latencies["post_binary"].append(
+                _request(f"{base_url}/homes/{home}/readings/binary", records.tobytes(), "application/octet-stream"))
+        else:
+            try:
+                latencies["query_home"].append(_request(f"{base_url}/homes/{home}/readings?limit=500"))
+            except urllib.error.HTTPError:
+                pass  # home has no readings yet
+    return latencies
+
+def run_load_test(base_url, concurrency=16, requests=200, batch_size=256, homes=1000, seed=42):
+    """
+    `concurrency` clients each send `requests` calls, rotating NDJSON posts, binary posts
+    and per-home range queries. Returns per-endpoint counts and p50/p99 latency (ms).
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda w: _worker(base_url, w, requests, batch_size, homes, seed + w), range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    rows = []
+    for endpoint in results[0]:
+        latencies = np.concatenate([np.asarray(r[endpoint]) for r in results]) * 1000
+        if not len(latencies):
+            continue
+        rows.append({
+            "endpoint": endpoint,
+            "requests": len(latencies),
+            "requests_per_sec": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+        })
+    with urllib.request.urlopen(f"{base_url}/stats", timeout=30) as response:
+        print("📊 Service stats:", json.load(response))
+    return pd.DataFrame(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the ingestion/query service.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per client")
+    parser.add_argument("--batch-size", type=int, default=256, help="Readings per posted batch")
+    parser.add_argument("--homes", type=int, default=1000)
+    parser.add_argument("--p50-target-ms", type=float, default=P50_TARGET_MS)
+    parser.add_argument("--p99-target-ms", type=float, default=P99_TARGET_MS)
+    args = parser.parse_args()
+
+    results = run_load_test(args.url.rstrip("/"), args.concurrency, args.requests, args.batch_size, args.homes)
+    print(results.to_string(index=False))
+
+    missed = results[(results["p50_ms"] > args.p50_target_ms) | (results["p99_ms"] > args.p99_target_ms)]
+    if len(missed):
+        print(f"❌ Latency targets missed (p50 ≤ {args.p50_target_ms} ms, p99 ≤ {args.p99_target_ms} ms): "
+              f"{', '.join(missed['endpoint'])}")
+        sys.exit(1)
+    print(f"✅ All endpoints within p50 ≤ {args.p50_target_ms} ms and p99 ≤ {args.p99_target_ms} ms")
+
+if __name__ == "__main__":
+    main()
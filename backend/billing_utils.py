@@ -1,29 +1,11 @@
 import numpy as np
 import tenseal as ts
+from backend.encryption import encrypt_values, decrypt_values
+from backend.tariff import load_tariff
 
-# BBMP/BESCOM slab billing function
+# BBMP/BESCOM slab billing (vectorized; accepts a scalar or an array of units)
 def compute_bbmp_bill(units):
-    total = 0
-    if units <= 50:
-        total += units * 4.15
-    elif units <= 100:
-        total += 50 * 4.15 + (units - 50) * 5.60
-    elif units <= 200:
-        total += 50 * 4.15 + 50 * 5.60 + (units - 100) * 7.15
-    else:
-        total += 50 * 4.15 + 50 * 5.60 + 100 * 7.15 + (units - 200) * 8.20
-    return total
-
-# CKKS encryption context setup
-def get_ckks_context():
-    context = ts.context(
-        ts.SCHEME_TYPE.CKKS,
-        poly_modulus_degree=8192,
-        coeff_mod_bit_sizes=[60, 40, 40, 60]
-    )
-    context.generate_galois_keys()
-    context.global_scale = 2 ** 40
-    return context
+    return load_tariff("bbmp").bill(units)
 
 # Encrypt value
 def encrypt_bill_value(context, value):
@@ -33,6 +15,19 @@ def encrypt_bill_value(context, value):
 def decrypt_bill_value(encrypted_vector):
     return encrypted_vector.decrypt()[0]
 
+# Encrypt many bills into packed CKKS vectors
+def encrypt_bill_values(context, values):
+    return encrypt_values(context, values)
+
+# Decrypt packed bills back into an array
+def decrypt_bill_values(context, encrypted_vectors):
+    return decrypt_values(context, encrypted_vectors)
+
+# Slab bills computed directly on packed encrypted usage (polynomial approximation)
+def compute_bbmp_bill_encrypted(encrypted_usage, max_units=400.0, degree=15):
+    from backend.encrypted_billing import encrypted_slab_bills
+    return encrypted_slab_bills(encrypted_usage, "bbmp", max_units, degree)
+
 # Apply Laplace noise
 def add_laplace_noise(value, noise_level):
     noise_map = {"Low": 1.0, "Medium": 3.0, "High": 6.0}
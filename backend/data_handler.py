@@ -1,6 +1,9 @@
-import pandas as pd
+from backend import api_client
+from backend.tail_reader import get_reader
 
 def load_decrypted_usage(path="decrypted/decrypted_usage.csv"):
-    df = pd.read_csv(path)
-    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    if api_client.API_URL:
+        return api_client.fetch_readings()[["timestamp", "home_id", "energy_kwh"]]
+    # Only rows appended since the last call are parsed
+    df = get_reader(path, dtypes={"home_id": str}).read()
     return df[["timestamp", "home_id", "energy_kwh"]]
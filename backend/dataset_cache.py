@@ -0,0 +1,101 @@
+# --- backend/dataset_cache.py ---
+
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler
+
+# Typed per-column .npy files are written here, one directory per source file version
+CACHE_DIR = "data/cache"
+
+def _source_key(path):
+    # mtime + size identifies a version of the raw file without hashing 130MB
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+def _cache_path(path, cache_dir):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f"{name}-{_source_key(path)}")
+
+def ingest(path, cache_dir=CACHE_DIR):
+    """
+    Parses the raw semicolon-separated UCI file once and writes one .npy per column:
+    `timestamp` (datetime64), the numeric columns (float64, interpolated) and a
+    `missing` mask marking rows that had any '?' in the source.
+    Returns the cache directory.
+    """
+    target = _cache_path(path, cache_dir)
+    if os.path.exists(os.path.join(target, "meta.json")):
+        return target
+
+    df = pd.read_csv(path, sep=";", na_values="?", low_memory=False)
+    timestamps = pd.to_datetime(df["Date"] + " " + df["Time"], format="%d/%m/%Y %H:%M:%S")
+    values = df.drop(columns=["Date", "Time"]).astype(float)
+    missing = values.isna().any(axis=1).to_numpy()
+    values = values.interpolate()
+
+    tmp = f"{target}.{os.getpid()}.tmp"
+    os.makedirs(tmp, exist_ok=True)
+    np.save(os.path.join(tmp, "timestamp.npy"), timestamps.to_numpy(dtype="datetime64[ns]"))
+    np.save(os.path.join(tmp, "missing.npy"), missing)
+    for column in values.columns:
+        np.save(os.path.join(tmp, f"{column}.npy"), values[column].to_numpy(dtype=np.float64))
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({
+            "source": os.path.abspath(path),
+            "key": _source_key(path),
+            "rows": len(df),
+            "columns": ["timestamp", "missing"] + list(values.columns),
+        }, f, indent=2)
+
+    # Publish atomically and drop caches built from older versions of the same file
+    try:
+        os.replace(tmp, target)
+    except OSError:
+        # Another process published the same version first
+        shutil.rmtree(tmp, ignore_errors=True)
+        return target
+    prefix = os.path.basename(target).rsplit("-", 2)[0] + "-"
+    for entry in os.listdir(cache_dir):
+        stale = os.path.join(cache_dir, entry)
+        if entry.startswith(prefix) and stale != target and not entry.endswith(".tmp"):
+            shutil.rmtree(stale, ignore_errors=True)
+    return target
+
+def load_columns(path, columns=None, cache_dir=CACHE_DIR):
+    """
+    Returns {column: read-only memory-mapped array}, ingesting the raw file first if needed.
+    """
+    target = ingest(path, cache_dir)
+    with open(os.path.join(target, "meta.json")) as f:
+        meta = json.load(f)
+    columns = columns or meta["columns"]
+    return {c: np.load(os.path.join(target, f"{c}.npy"), mmap_mode="r") for c in columns}
+
+def save_scaler(path, scaler, column, cache_dir=CACHE_DIR):
+    params = {
+        "feature_range": list(scaler.feature_range),
+        "data_min_": scaler.data_min_.tolist(),
+        "data_max_": scaler.data_max_.tolist(),
+        "n_samples_seen_": int(scaler.n_samples_seen_),
+    }
+    with open(os.path.join(ingest(path, cache_dir), f"{column}.scaler.json"), "w") as f:
+        json.dump(params, f, indent=2)
+
+def load_scaler(path, column, cache_dir=CACHE_DIR):
+    """
+    Returns the persisted MinMaxScaler for `column`, or None if it has not been fitted yet.
+    """
+    scaler_path = os.path.join(ingest(path, cache_dir), f"{column}.scaler.json")
+    if not os.path.exists(scaler_path):
+        return None
+    with open(scaler_path) as f:
+        params = json.load(f)
+    data_min, data_max = np.array(params["data_min_"]), np.array(params["data_max_"])
+    # partial_fit on the two extremes restores every fitted attribute (min_, scale_, ...)
+    scaler = MinMaxScaler(feature_range=tuple(params["feature_range"]))
+    scaler.partial_fit(np.vstack([data_min, data_max]))
+    scaler.n_samples_seen_ = params["n_samples_seen_"]
+    return scaler
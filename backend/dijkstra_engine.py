@@ -0,0 +1,188 @@
+# --- backend/dijkstra_engine.py ---
+
+import heapq
+from bisect import bisect_left
+from collections.abc import Mapping
+import numpy as np
+
+def build_csr(num_nodes, u, v, weights, return_edge_ids=False):
+    """
+    Builds an undirected CSR adjacency from edge arrays.
+    Returns (indptr, indices, weights); neighbours of each node are sorted by id.
+    With return_edge_ids=True also returns `edge_ids` (the edge index in (u, v, weights)
+    behind every CSR slot) and `slots` (shape (E, 2): the two CSR slots of every edge),
+    so single edges can be reweighted in place.
+    """
+    src, dst = np.concatenate([u, v]), np.concatenate([v, u])
+    order = np.lexsort((dst, src))
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=num_nodes), out=indptr[1:])
+    csr = indptr, dst[order], np.concatenate([weights, weights])[order]
+    if return_edge_ids:
+        slots = np.empty(len(order), dtype=np.int64)
+        slots[order] = np.arange(len(order))
+        return csr + (order % max(len(u), 1), slots.reshape(2, -1).T)
+    return csr
+
+class LazyPaths(Mapping):
+    """
+    Read-only {node: path} mapping that rebuilds a path from the predecessor
+    array only when it is first requested. Unreachable nodes map to [].
+    """
+
+    def __init__(self, prev, source):
+        self._prev = prev
+        self._source = source
+        self._cache = {}
+
+    def __getitem__(self, node):
+        if not isinstance(node, (int, np.integer)) or not 0 <= node < len(self._prev):
+            raise KeyError(node)
+        if node not in self._cache:
+            path = []
+            step = node
+            while step != -1:
+                path.append(step)
+                step = self._prev[step]
+            path.reverse()
+            self._cache[node] = path if path[0] == self._source else []
+        return self._cache[node]
+
+    @property
+    def predecessors(self):
+        return self._prev
+
+    def __iter__(self):
+        return iter(range(len(self._prev)))
+
+    def __len__(self):
+        return len(self._prev)
+
+def _as_lists(indptr, indices, weights):
+    if isinstance(indptr, np.ndarray):
+        return indptr.tolist(), indices.tolist(), weights.tolist()
+    return indptr, indices, weights
+
+def shortest_path_tree(indptr, indices, weights, source, trace=False):
+    """
+    Binary-heap Dijkstra over a CSR graph, O((V + E) log V).
+    Returns (dist, prev, steps) as plain lists; prev[v] is -1 for the source and
+    unreachable nodes. `steps` is only filled when trace=True.
+    """
+    indptr, indices, weights = _as_lists(indptr, indices, weights)
+    num_nodes = len(indptr) - 1
+    dist = [float('inf')] * num_nodes
+    prev = [-1] * num_nodes
+    visited = [False] * num_nodes
+    steps = []
+    dist[source] = 0
+    heap = [(0, source)]
+
+    while heap:
+        d, u = heapq.heappop(heap)
+        if visited[u]:
+            continue
+        visited[u] = True
+        if trace:
+            steps.append((u, dict(enumerate(dist))))
+        for k in range(indptr[u], indptr[u + 1]):
+            v = indices[k]
+            nd = d + weights[k]
+            if nd < dist[v]:
+                dist[v] = nd
+                prev[v] = u
+                heapq.heappush(heap, (nd, v))
+
+    if trace:
+        # Unreachable nodes are still "visited" (at distance inf) by the linear-scan version
+        snapshot = dict(enumerate(dist))
+        steps.extend((u, dict(snapshot)) for u in range(num_nodes) if not visited[u])
+
+    return dist, prev, steps
+
+def heap_dijkstra(indptr, indices, weights, source, trace=False):
+    """
+    Returns (dist, paths, steps) like the graph classes' dijkstra: `dist` maps
+    node -> cost (inf if unreachable), `paths` is a LazyPaths mapping and
+    `steps` lists (visited_node, distances_snapshot) in visit order when
+    trace=True (empty otherwise).
+    """
+    dist, prev, steps = shortest_path_tree(indptr, indices, weights, source, trace=trace)
+    return dict(enumerate(dist)), LazyPaths(prev, source), steps
+
+def repair_tree(indptr, indices, weights, dist, prev, changed_edges):
+    """
+    Repairs a shortest-path tree in place after edge weights changed, touching only
+    the nodes whose distance can change (dynamic SSSP).
+
+    `changed_edges` holds (a, b, old_weight) for undirected edges whose current
+    weight in the CSR differs from old_weight (old_weight=inf for new edges).
+    Increased tree edges detach the subtree below them, which is re-seeded from
+    its boundary; decreased edges seed the endpoints they improve. A heap then
+    propagates the improvements. Returns the number of nodes whose label was reset
+    or improved.
+    """
+    indptr, indices, weights = _as_lists(indptr, indices, weights)
+    inf = float('inf')
+
+    def weight(a, b):
+        row = indices[indptr[a]:indptr[a + 1]]
+        k = bisect_left(row, b)
+        return weights[indptr[a] + k] if k < len(row) and row[k] == b else inf
+
+    # 1. Detach subtrees hanging off edges that got more expensive
+    detached = set()
+    stack = []
+    for a, b, old in changed_edges:
+        if weight(a, b) > old:
+            if prev[b] == a and b not in detached:
+                stack.append(b)
+            elif prev[a] == b and a not in detached:
+                stack.append(a)
+        while stack:
+            x = stack.pop()
+            if x in detached:
+                continue
+            detached.add(x)
+            for k in range(indptr[x], indptr[x + 1]):
+                y = indices[k]
+                if prev[y] == x:
+                    stack.append(y)
+    for x in detached:
+        dist[x] = inf
+        prev[x] = -1
+
+    # 2. Seed the heap from the boundary of the detached region and from cheaper edges
+    heap = []
+    for x in detached:
+        for k in range(indptr[x], indptr[x + 1]):
+            y = indices[k]
+            if y not in detached and dist[y] + weights[k] < dist[x]:
+                dist[x] = dist[y] + weights[k]
+                prev[x] = y
+        if dist[x] < inf:
+            heapq.heappush(heap, (dist[x], x))
+    for a, b, old in changed_edges:
+        w = weight(a, b)
+        if w < old:
+            for x, y in [(a, b), (b, a)]:
+                if dist[x] + w < dist[y]:
+                    dist[y] = dist[x] + w
+                    prev[y] = x
+                    heapq.heappush(heap, (dist[y], y))
+
+    # 3. Propagate improvements (label-correcting Dijkstra from the seeds)
+    touched = len(detached)
+    while heap:
+        d, x = heapq.heappop(heap)
+        if d > dist[x]:
+            continue
+        touched += 1
+        for k in range(indptr[x], indptr[x + 1]):
+            y = indices[k]
+            nd = d + weights[k]
+            if nd < dist[y]:
+                dist[y] = nd
+                prev[y] = x
+                heapq.heappush(heap, (nd, y))
+    return touched
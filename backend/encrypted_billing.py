@@ -0,0 +1,133 @@
+# --- backend/encrypted_billing.py ---
+
+import argparse
+import math
+import time
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from backend.encryption import get_ckks_context, encrypt_values, decrypt_values, slot_count
+from backend.tariff import load_tariff, DEFAULT_TARIFF
+
+MAX_UNITS = 400.0
+DEGREE = 15
+# Worst plaintext error of the default fit (bbmp, degree 15 on [0, 400] kWh); tests hold it to this
+MAX_ERROR_RS = 7.0
+POLY_MODULUS_DEGREE = 16384  # 8192 homes per ciphertext
+
+def billing_context(degree=DEGREE):
+    """
+    Shared CKKS context with enough 40-bit levels for one rescale plus a degree-`degree`
+    polyval (no Galois keys: billing is slot-wise).
+    """
+    levels = math.ceil(math.log2(degree + 1)) + 1
+    return get_ckks_context(POLY_MODULUS_DEGREE, (60,) + (40,) * levels + (60,), galois_keys=False)
+
+class PolynomialSlabBill:
+    """
+    Slab tariff approximated by one polynomial so it can be evaluated on CKKS ciphertexts.
+
+    Usage is mapped to x = 2 * units / max_units - 1 and the bill is fitted with a
+    Chebyshev least-squares polynomial of `degree` on [0, max_units], converted to
+    the power basis for CKKSVector.polyval. Every operation acts on all slots, so one
+    polyval bills a full ciphertext of homes.
+
+    A polynomial cannot follow the slab kinks exactly, so the error shrinks only
+    slowly with degree, and power-basis coefficients past degree ~15 grow enough to
+    lose CKKS precision. The fit is therefore weighted by 1 / (bill + bill at the first
+    slab boundary): roughly relative error above the first slab, absolute below it,
+    so small bills are not swamped. For bbmp at the defaults that is at most ~Rs 7
+    (MAX_ERROR_RS), about 2% of the bill above 10 kWh and under Rs 0.5 below it.
+    `max_error` is the measured worst plaintext error. Usage outside [0, max_units]
+    is not covered and diverges quickly; check it with `covers` and clamp before
+    encrypting.
+    """
+
+    def __init__(self, tariff=None, max_units=MAX_UNITS, degree=DEGREE, nodes=2000):
+        self.tariff = tariff or load_tariff()
+        self.max_units = float(max_units)
+        self.degree = degree
+        x = np.cos(np.pi * (np.arange(nodes) + 0.5) / nodes)
+        bills = self.tariff.bill(self._units(x))
+        first_slab = self.tariff.bill(self.tariff.lower[1]) if len(self.tariff.lower) > 1 else 1.0
+        cheb = np.polynomial.chebyshev.chebfit(x, bills, degree, w=1 / (bills + first_slab))
+        self.coefficients = np.polynomial.chebyshev.cheb2poly(cheb)
+        grid = np.linspace(0.0, self.max_units, 10001)
+        self.max_error = float(np.abs(self.evaluate_plain(grid) - self.tariff.bill(grid)).max())
+
+    def _units(self, x):
+        return (x + 1) * self.max_units / 2
+
+    def covers(self, units):
+        """True where `units` lies inside the fitted range [0, max_units]."""
+        units = np.asarray(units, dtype=np.float64)
+        return (units >= 0) & (units <= self.max_units)
+
+    def evaluate_plain(self, units):
+        x = 2 * np.asarray(units, dtype=np.float64) / self.max_units - 1
+        return np.polynomial.polynomial.polyval(x, self.coefficients)
+
+    def evaluate(self, encrypted_usage):
+        """Maps packed encrypted usage vectors to packed encrypted bills, without decrypting."""
+        coefficients = self.coefficients.tolist()
+        return [(vec * (2 / self.max_units) - 1).polyval(coefficients) for vec in encrypted_usage]
+
+@lru_cache(maxsize=None)
+def slab_polynomial(tariff_name=DEFAULT_TARIFF, max_units=MAX_UNITS, degree=DEGREE):
+    return PolynomialSlabBill(load_tariff(tariff_name), max_units, degree)
+
+def encrypted_slab_bills(encrypted_usage, tariff_name=DEFAULT_TARIFF, max_units=MAX_UNITS, degree=DEGREE):
+    """Homomorphic slab bills for packed usage vectors encrypted under billing_context(degree)."""
+    return slab_polynomial(tariff_name, max_units, degree).evaluate(encrypted_usage)
+
+def run_benchmark(num_homes=10000, degrees=(3, 7, 11, 15), max_units=MAX_UNITS, seed=42):
+    """
+    Bills `num_homes` random usages on ciphertexts for every degree and compares the
+    decrypted bills with compute_bbmp_bill. Times are per home (microseconds).
+    """
+    from backend.billing_utils import compute_bbmp_bill
+
+    units = np.random.default_rng(seed).uniform(0, max_units, num_homes)
+    expected = compute_bbmp_bill(units)
+    rows = []
+    for degree in degrees:
+        context = billing_context(degree)
+        approximation = slab_polynomial(DEFAULT_TARIFF, max_units, degree)
+
+        start = time.perf_counter()
+        encrypted = encrypt_values(context, units)
+        encrypted_at = time.perf_counter()
+        bills = approximation.evaluate(encrypted)
+        billed_at = time.perf_counter()
+        decrypted = decrypt_values(context, bills)
+        done = time.perf_counter()
+
+        error = np.abs(decrypted - expected)
+        rows.append({
+            "degree": degree,
+            "homes": num_homes,
+            "ciphertexts": len(encrypted),
+            "slots": slot_count(context),
+            "encrypt_us_per_home": round((encrypted_at - start) / num_homes * 1e6, 2),
+            "bill_us_per_home": round((billed_at - encrypted_at) / num_homes * 1e6, 2),
+            "decrypt_us_per_home": round((done - billed_at) / num_homes * 1e6, 2),
+            "max_abs_error_rs": round(float(error.max()), 3),
+            "mean_abs_error_rs": round(float(error.mean()), 3),
+            "max_rel_error": round(float((error / np.maximum(expected, 1.0)).max()), 4),
+        })
+        print(rows[-1])
+    return pd.DataFrame(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark slab billing evaluated on CKKS ciphertexts.")
+    parser.add_argument("--homes", type=int, default=10000)
+    parser.add_argument("--degrees", type=int, nargs="+", default=[3, 7, 11, 15])
+    parser.add_argument("--max-units", type=float, default=MAX_UNITS)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    results = run_benchmark(args.homes, args.degrees, args.max_units, args.seed)
+    print(results.to_string(index=False))
+
+if __name__ == "__main__":
+    main()
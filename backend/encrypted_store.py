@@ -0,0 +1,290 @@
+# --- backend/encrypted_store.py ---
+
+import argparse
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+import tenseal as ts
+from backend.encryption import get_ckks_context, pack_readings
+
+STORE_DIR = "data/encrypted_store"
+SEGMENT_BYTES = 64 * 2**20
+INDEX_COLUMNS = ["record", "segment", "offset", "length", "slot_offset", "size", "home_id", "count", "t_min", "t_max"]
+SLOT_DTYPE = np.dtype([("timestamp", "<i8"), ("home", "<i4")])
+
+class EncryptedStore:
+    """
+    Append-only store of serialized packed CKKS vectors.
+
+    Ciphertexts are appended to `seg-NNNNN.ct`; the timestamp and home code of every
+    slot go to the matching `seg-NNNNN.slots` file, and `index.csv` gets one row per
+    (record, home) with the byte range and time span. Index rows are written after the
+    bytes, so readers never see a partial record. Segments roll over at
+    `segment_bytes`. Readers memory-map only the segments a query touches and get
+    ciphertexts back without re-encrypting; they need the same CKKS context that
+    wrote the store.
+    """
+
+    def __init__(self, path=STORE_DIR, context=None, segment_bytes=SEGMENT_BYTES):
+        self.path = path
+        self.context = context or get_ckks_context()
+        self.segment_bytes = segment_bytes
+        os.makedirs(path, exist_ok=True)
+        self._meta_path = os.path.join(path, "meta.json")
+        self._index_path = os.path.join(path, "index.csv")
+        self.meta = self._load_meta()
+        self._home_codes = {home: code for code, home in enumerate(self.meta["homes"])}
+        self._index = None
+        self._index_size = -1
+        self._maps = {}
+
+    def _load_meta(self):
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                return json.load(f)
+        return {
+            "poly_modulus_degree": self.context.seal_context().data.key_context_data().parms().poly_modulus_degree(),
+            "homes": [],
+            "records": 0,
+            "segment": 0,
+        }
+
+    def _save_meta(self):
+        tmp = f"{self._meta_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.meta, f, indent=2)
+        os.replace(tmp, self._meta_path)
+
+    def _segment_path(self, segment, ext):
+        return os.path.join(self.path, f"seg-{segment:05d}.{ext}")
+
+    def _home_code(self, home):
+        if home not in self._home_codes:
+            self._home_codes[home] = len(self.meta["homes"])
+            self.meta["homes"].append(home)
+        return self._home_codes[home]
+
+    # ---- writing ----
+
+    def append_packed(self, encrypted_vectors, layout):
+        """
+        Persists vectors from pack_readings as-is. `layout` needs home_id, timestamp,
+        ciphertext and slot columns. Returns the number of readings stored.
+        """
+        segment = self.meta["segment"]
+        ct_path = self._segment_path(segment, "ct")
+        if os.path.exists(ct_path) and os.path.getsize(ct_path) >= self.segment_bytes:
+            segment = self.meta["segment"] = segment + 1
+            ct_path = self._segment_path(segment, "ct")
+        slots_path = self._segment_path(segment, "slots")
+
+        timestamps = pd.to_datetime(layout["timestamp"]).to_numpy(dtype="datetime64[ns]").view("i8")
+        homes = layout["home_id"].to_numpy()
+        ciphertexts = layout["ciphertext"].to_numpy()
+        slots = layout["slot"].to_numpy()
+
+        rows = []
+        with open(ct_path, "ab") as ct_file, open(slots_path, "ab") as slots_file:
+            offset = ct_file.tell()
+            slot_offset = slots_file.tell() // SLOT_DTYPE.itemsize
+            for c, vec in enumerate(encrypted_vectors):
+                data = vec.serialize()
+                size = vec.size()
+                in_vec = ciphertexts == c
+                slot_records = np.zeros(size, dtype=SLOT_DTYPE)
+                slot_records["home"] = -1
+                slot_records["timestamp"][slots[in_vec]] = timestamps[in_vec]
+                slot_records["home"][slots[in_vec]] = [self._home_code(h) for h in homes[in_vec]]
+                ct_file.write(data)
+                slots_file.write(slot_records.tobytes())
+
+                record = self.meta["records"]
+                self.meta["records"] += 1
+                for home in pd.unique(homes[in_vec]):
+                    ts_home = timestamps[in_vec][homes[in_vec] == home]
+                    rows.append((record, segment, offset, len(data), slot_offset, size, home,
+                                 len(ts_home), int(ts_home.min()), int(ts_home.max())))
+                offset += len(data)
+                slot_offset += size
+
+        # Meta first: any home a reader finds in the index is already in meta["homes"]
+        self._save_meta()
+        index_exists = os.path.exists(self._index_path)
+        pd.DataFrame(rows, columns=INDEX_COLUMNS).to_csv(self._index_path, mode="a", header=not index_exists, index=False)
+        return len(layout)
+
+    def append(self, home_ids, timestamps, values):
+        """Encrypts readings into packed vectors and appends them."""
+        vectors, layout = pack_readings(self.context, values, np.asarray(home_ids), np.asarray(timestamps))
+        return self.append_packed(vectors, layout)
+
+    # ---- reading ----
+
+    def index(self):
+        size = os.path.getsize(self._index_path) if os.path.exists(self._index_path) else 0
+        if size != self._index_size:
+            self._index = (pd.read_csv(self._index_path, dtype={"home_id": str}) if size
+                           else pd.DataFrame(columns=INDEX_COLUMNS))
+            self._index_size = size
+            if os.path.exists(self._meta_path):
+                # Pick up homes registered by another writer since this store was opened
+                with open(self._meta_path) as f:
+                    self.meta["homes"] = json.load(f)["homes"]
+                self._home_codes = {home: code for code, home in enumerate(self.meta["homes"])}
+        return self._index
+
+    def _map(self, segment, ext, dtype):
+        path = self._segment_path(segment, ext)
+        size = os.path.getsize(path)
+        key = (segment, ext)
+        if key not in self._maps or self._maps[key][0] != size:
+            self._maps[key] = (size, np.memmap(path, dtype=dtype, mode="r"))
+        return self._maps[key][1]
+
+    def records(self, home_id=None, start=None, end=None):
+        """
+        Index rows of the records holding readings for `home_id` (all homes if None)
+        within [start, end].
+        """
+        index = self.index()
+        keep = np.ones(len(index), dtype=bool)
+        if home_id is not None:
+            keep &= (index["home_id"] == home_id).to_numpy()
+        if start is not None:
+            keep &= index["t_max"].to_numpy() >= pd.Timestamp(start).value
+        if end is not None:
+            keep &= index["t_min"].to_numpy() <= pd.Timestamp(end).value
+        return index[keep]
+
+    def load(self, home_id=None, start=None, end=None):
+        """
+        Yields (ciphertext, slot_mask, slots) for every matching record. `slot_mask` is None
+        when every slot in the record matches, else a 0/1 array selecting the readings of
+        `home_id` in the time range; `slots` holds per-slot timestamp and home code.
+        Yields nothing for a home the store has never seen.
+        """
+        # records() refreshes the home codes, so look the code up afterwards
+        records = self.records(home_id, start, end)
+        code = None
+        if home_id is not None:
+            if home_id not in self._home_codes:
+                return
+            code = self._home_codes[home_id]
+        for row in records.drop_duplicates("record").itertuples(index=False):
+            raw = self._map(row.segment, "ct", np.uint8)[row.offset:row.offset + row.length]
+            slots = self._map(row.segment, "slots", SLOT_DTYPE)[row.slot_offset:row.slot_offset + row.size]
+            match = slots["home"] >= 0
+            if code is not None:
+                match &= slots["home"] == code
+            if start is not None:
+                match &= slots["timestamp"] >= pd.Timestamp(start).value
+            if end is not None:
+                match &= slots["timestamp"] <= pd.Timestamp(end).value
+            vec = ts.ckks_vector_from(self.context, raw.tobytes())
+            yield vec, (None if match.all() else match.astype(float)), slots
+
+    @staticmethod
+    def _fold(by_size):
+        # Same-size vectors are added slot-wise first, then each is rotate-summed once
+        total = None
+        for vec in by_size.values():
+            summed = vec.sum()
+            total = summed if total is None else total + summed
+        return total
+
+    def encrypted_sum(self, home_id=None, start=None, end=None):
+        """
+        Homomorphic sum of the matching readings, returned still encrypted (a size-1
+        CKKS vector; rotations need Galois keys) or None if nothing matches.
+        """
+        by_size = {}
+        for vec, mask, _ in self.load(home_id, start, end):
+            if mask is not None:
+                vec = vec * mask.tolist()
+            size = vec.size()
+            by_size[size] = vec if size not in by_size else by_size[size] + vec
+        return self._fold(by_size)
+
+    def encrypted_sums_by_home(self, start=None, end=None):
+        """
+        {home_id: encrypted sum} for every home with readings in [start, end], reading
+        each record once. Records whose selected slots carry the same home codes (the
+        slot layout is public metadata) are first added slot-wise into one accumulator,
+        so the per-home masking runs once per distinct layout rather than once per record;
+        streams that keep homes at stable slots, like the round-robin replay, reuse a
+        handful of layouts. Each home then costs one rotate-sum.
+        """
+        by_layout = {}
+        for vec, mask, slots in self.load(None, start, end):
+            homes = np.where(slots["home"] >= 0 if mask is None else mask.astype(bool), slots["home"], -1)
+            if mask is not None:
+                vec = vec * mask.tolist()
+            key = homes.tobytes()
+            by_layout[key] = (homes, vec) if key not in by_layout else (homes, by_layout[key][1] + vec)
+
+        by_home = {}
+        for homes, vec in by_layout.values():
+            for code in np.unique(homes[homes >= 0]):
+                masked = vec * (homes == code).astype(float).tolist()
+                by_size = by_home.setdefault(self.meta["homes"][code], {})
+                size = masked.size()
+                by_size[size] = masked if size not in by_size else by_size[size] + masked
+        return {home: self._fold(by_size) for home, by_size in by_home.items()}
+
+    def disk_usage(self):
+        return sum(os.path.getsize(os.path.join(self.path, name)) for name in os.listdir(self.path))
+
+def compare_with_csv(df, store_dir, csv_path, context=None, batch_size=4096):
+    """
+    Writes the same readings to the encrypted store and to a plaintext CSV and
+    reports bytes per reading plus write and query throughput for both.
+    """
+    context = context or get_ckks_context()
+    store = EncryptedStore(store_dir, context)
+    start = time.perf_counter()
+    for offset in range(0, len(df), batch_size):
+        batch = df.iloc[offset:offset + batch_size]
+        store.append(batch["home_id"], batch["timestamp"], batch["energy_kwh"].to_numpy())
+    store_write = time.perf_counter() - start
+
+    start = time.perf_counter()
+    df.to_csv(csv_path, index=False)
+    csv_write = time.perf_counter() - start
+
+    home = df["home_id"].iloc[0]
+    start = time.perf_counter()
+    encrypted_total = store.encrypted_sum(home).decrypt()[0]
+    store_query = time.perf_counter() - start
+
+    start = time.perf_counter()
+    plain = pd.read_csv(csv_path)
+    plain_total = plain.loc[plain["home_id"] == home, "energy_kwh"].sum()
+    csv_query = time.perf_counter() - start
+
+    rows = len(df)
+    return pd.DataFrame([
+        {"format": "ckks_store", "bytes": store.disk_usage(), "bytes_per_reading": store.disk_usage() / rows,
+         "write_readings_per_sec": rows / store_write, "home_sum_seconds": store_query, "home_sum": encrypted_total},
+        {"format": "csv", "bytes": os.path.getsize(csv_path), "bytes_per_reading": os.path.getsize(csv_path) / rows,
+         "write_readings_per_sec": rows / csv_write, "home_sum_seconds": csv_query, "home_sum": plain_total},
+    ])
+
+def main():
+    from backend.streaming import load_dataset, INPUT_FILE
+
+    parser = argparse.ArgumentParser(description="Compare the encrypted reading store with plaintext CSV.")
+    parser.add_argument("--input", default=INPUT_FILE)
+    parser.add_argument("--store", default=STORE_DIR)
+    parser.add_argument("--csv", default="data/usage_compare.csv")
+    parser.add_argument("--limit", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=4096)
+    args = parser.parse_args()
+
+    df = load_dataset(args.input).iloc[:args.limit]
+    results = compare_with_csv(df, args.store, args.csv, batch_size=args.batch_size)
+    print(results.to_string(index=False))
+
+if __name__ == "__main__":
+    main()
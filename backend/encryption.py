@@ -1,17 +1,159 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
 import tenseal as ts
 
-def get_ckks_context(poly_modulus_degree=8192, coeff_mod_bit_sizes=[60, 40, 40, 60], global_scale=2**40):
+# Serialized contexts (including the secret key) are cached here so cold starts skip key generation
+CONTEXT_CACHE_DIR = os.environ.get("SEER_CKKS_CACHE", ".ckks")
+
+_contexts = {}
+_contexts_lock = threading.Lock()
+
+def _context_path(cache_dir, poly_modulus_degree, coeff_mod_bit_sizes, global_scale):
+    bits = "-".join(str(b) for b in coeff_mod_bit_sizes)
+    return os.path.join(cache_dir, f"ckks_{poly_modulus_degree}_{bits}_{int(global_scale).bit_length() - 1}.ctx")
+
+def _build_context(poly_modulus_degree, coeff_mod_bit_sizes, global_scale):
     context = ts.context(
         ts.SCHEME_TYPE.CKKS,
         poly_modulus_degree=poly_modulus_degree,
-        coeff_mod_bit_sizes=coeff_mod_bit_sizes,
+        coeff_mod_bit_sizes=list(coeff_mod_bit_sizes),
     )
-    context.generate_galois_keys()
     context.global_scale = global_scale
     return context
 
+def _write_tmp(context, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(context.serialize(save_secret_key=True, save_galois_keys=context.has_galois_keys()))
+    os.chmod(tmp_path, 0o600)
+    return tmp_path
+
+def _publish_context(context, path):
+    # Hard-linking a complete file is atomic and fails if `path` exists, so exactly one
+    # process creates the cache; the others get False and must load the winner's keys
+    tmp_path = _write_tmp(context, path)
+    try:
+        os.link(tmp_path, path)
+        return True
+    except FileExistsError:
+        return False
+    finally:
+        os.remove(tmp_path)
+
+def _save_context(context, path):
+    os.replace(_write_tmp(context, path), path)
+
+def _load_context(path):
+    with open(path, "rb") as f:
+        return ts.context_from(f.read())
+
+def get_ckks_context(poly_modulus_degree=8192, coeff_mod_bit_sizes=(60, 40, 40, 60), global_scale=2**40,
+                     galois_keys=True, cache_dir=CONTEXT_CACHE_DIR):
+    """
+    Returns the shared CKKS context for this parameter set, generating keys at most once per process.
+    There is one secret key per parameter set, so ciphertexts move freely between callers. Galois
+    keys are added to that context (and the cache re-saved) the first time a caller asks for them;
+    galois_keys=False callers skip that cost. Set cache_dir=None to skip the on-disk cache.
+
+    Processes starting together without a cache agree on one key: the cache file is created
+    exclusively, and a process that loses the race loads the winner's context instead of its own.
+    """
+    params = (poly_modulus_degree, tuple(coeff_mod_bit_sizes), global_scale)
+    with _contexts_lock:
+        path = _context_path(cache_dir, *params) if cache_dir else None
+        context = _contexts.get(params)
+        if context is None:
+            if path and os.path.exists(path):
+                context = _load_context(path)
+            else:
+                context = _build_context(*params)
+                if path and not _publish_context(context, path):
+                    context = _load_context(path)
+            _contexts[params] = context
+
+        if galois_keys and not context.has_galois_keys():
+            # Another process may have added them since we loaded; the secret key is the same either way
+            on_disk = _load_context(path) if path else None
+            if on_disk is not None and on_disk.has_galois_keys():
+                context = _contexts[params] = on_disk
+            else:
+                context.generate_galois_keys()
+                if path:
+                    _save_context(context, path)
+        return context
+
+def slot_count(context):
+    # CKKS packs poly_modulus_degree / 2 values into one ciphertext
+    return context.seal_context().data.key_context_data().parms().poly_modulus_degree() // 2
+
 def encrypt_value(context, value):
     return ts.ckks_vector(context, [value])
 
 def decrypt_value(context, encrypted_vector):
     return encrypted_vector.decrypt()[0]
+
+def encrypt_values(context, values):
+    values = np.asarray(values, dtype=float).ravel()
+    slots = slot_count(context)
+    return [ts.ckks_vector(context, values[i:i + slots].tolist()) for i in range(0, len(values), slots)]
+
+def decrypt_values(context, encrypted_vectors):
+    if not encrypted_vectors:
+        return np.empty(0)
+    return np.concatenate([np.asarray(vec.decrypt()) for vec in encrypted_vectors])
+
+def pack_readings(context, values, home_ids=None, timestamps=None):
+    """
+    Encrypts an array of readings into as few CKKS vectors as possible.
+    Returns (encrypted_vectors, layout) where layout maps each reading to its
+    (home_id, timestamp) and its (ciphertext, slot) position.
+    """
+    values = np.asarray(values, dtype=float).ravel()
+    slots = slot_count(context)
+    index = np.arange(len(values))
+    layout = pd.DataFrame({
+        "home_id": home_ids if home_ids is not None else pd.NA,
+        "timestamp": timestamps if timestamps is not None else pd.NA,
+        "ciphertext": index // slots,
+        "slot": index % slots,
+    })
+    return encrypt_values(context, values), layout
+
+def unpack_readings(context, encrypted_vectors, layout):
+    """
+    Decrypts packed vectors and returns the layout with a `value` column.
+    """
+    flat = decrypt_values(context, encrypted_vectors)
+    position = layout["ciphertext"].to_numpy() * slot_count(context) + layout["slot"].to_numpy()
+    result = layout.copy()
+    result["value"] = flat[position]
+    return result
+
+def pack_segments(context, values, segments, keys=None, segment_slots=1):
+    """
+    Encrypts readings in a fixed layout: segment id s owns slots [s % per_lane * segment_slots,
+    ... + segment_slots) of lane s // per_lane, where per_lane = slots // segment_slots. A segment's
+    readings fill its run in order and spill into further ciphertexts; each ciphertext holds one
+    lane and one key. Vectors of the same lane line up slot for slot, so they can be summed
+    with plain additions. Returns (encrypted_vectors, layout) with ciphertext, slot, lane and
+    key columns; every vector has the full slot count.
+    """
+    values = np.asarray(values, dtype=float).ravel()
+    segments = np.asarray(segments, dtype=np.int64)
+    slots = slot_count(context)
+    per_lane = slots // segment_slots
+    keys = np.zeros(len(values), dtype=np.int64) if keys is None else np.asarray(keys)
+    key_codes, key_values = pd.factorize(keys)
+
+    lane = segments // per_lane
+    ordinal = pd.DataFrame({"key": key_codes, "segment": segments}).groupby(["key", "segment"]).cumcount().to_numpy()
+    slot = segments % per_lane * segment_slots + ordinal % segment_slots
+    ciphertext, cells = pd.factorize(pd.MultiIndex.from_arrays([key_codes, lane, ordinal // segment_slots]))
+
+    plain = np.zeros((len(cells), slots))
+    plain[ciphertext, slot] = values
+    layout = pd.DataFrame({"ciphertext": ciphertext, "slot": slot, "lane": lane, "key": key_values[key_codes]})
+    return [ts.ckks_vector(context, row.tolist()) for row in plain], layout
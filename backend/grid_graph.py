@@ -0,0 +1,68 @@
+# --- backend/grid_graph.py ---
+
+import random
+import numpy as np
+import networkx as nx
+
+def make_rng(seed=None):
+    # Without an explicit seed, draw one from `random` so pages that call random.seed() stay reproducible
+    return np.random.default_rng(seed if seed is not None else random.getrandbits(64))
+
+def random_edge_arrays(num_nodes, density, rng=None, min_weight=1, max_weight=20):
+    """
+    Samples an Erdős–Rényi graph in bulk: every pair (i < j) is an edge with probability
+    `density`, weights are integers in [min_weight, max_weight]. Returns (u, v, weights)
+    arrays ordered by (u, v). Gaps between chosen pair indices are geometric, so the cost
+    is O(edges) rather than O(nodes²).
+    """
+    rng = rng or make_rng()
+    num_pairs = num_nodes * (num_nodes - 1) // 2
+    if num_pairs == 0 or density <= 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty.copy(), empty.copy()
+
+    if density >= 1:
+        k = np.arange(num_pairs, dtype=np.int64)
+    else:
+        chunks, last = [], -1
+        while True:
+            size = int((num_pairs - 1 - last) * density * 1.05) + 64
+            k = last + np.cumsum(rng.geometric(density, size=size))
+            chunks.append(k[k < num_pairs])
+            if k[-1] >= num_pairs:
+                break
+            last = k[-1]
+        k = np.concatenate(chunks).astype(np.int64)
+
+    # Invert the row-major upper-triangle index k -> (i, j), then fix float rounding at row edges
+    n = num_nodes
+    row_start = lambda r: r * (2 * n - r - 1) // 2
+    i = (n - 2 - np.floor(np.sqrt(-8 * k + 4 * n * (n - 1) - 7) / 2 - 0.5)).astype(np.int64)
+    i -= k < row_start(i)
+    i += k >= row_start(i + 1)
+    j = k - row_start(i) + i + 1
+    weights = rng.integers(min_weight, max_weight + 1, size=len(k))
+    return i, j, weights
+
+def edge_arrays(edges):
+    """
+    Accepts a list of (u, v, weight) tuples or a (u, v, weights) tuple of arrays.
+    """
+    if isinstance(edges, tuple) and len(edges) == 3 and isinstance(edges[0], np.ndarray):
+        u, v, w = edges
+        return np.asarray(u, dtype=np.int64), np.asarray(v, dtype=np.int64), np.asarray(w)
+    if not len(edges):
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty.copy(), empty.copy()
+    u, v, w = zip(*edges)
+    return np.array(u, dtype=np.int64), np.array(v, dtype=np.int64), np.array(w)
+
+def power_weighted_costs(u, v, base_costs, powers):
+    # Edges between well-powered nodes get cheaper; one vectorized pass over all edges
+    return np.round(base_costs / (powers[u] * powers[v]), 2)
+
+def to_networkx(num_nodes, u, v, weights):
+    graph = nx.Graph()
+    graph.add_nodes_from(range(num_nodes))
+    graph.add_weighted_edges_from(zip(u.tolist(), v.tolist(), weights.tolist()))
+    return graph
@@ -0,0 +1,241 @@
+# --- backend/ingestion.py ---
+
+import argparse
+import asyncio
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import IsolationForest
+from backend.encryption import get_ckks_context, pack_readings, unpack_readings
+from backend.privacy import laplace_mechanism
+
+EPSILON = 1.5
+PARTITIONS = 8
+QUEUE_SIZE = 10000
+BATCH_SIZE = 1024
+BATCH_TIMEOUT = 0.2
+
+# ---- CPU stage (runs in worker processes) ----
+
+_worker = {}
+
+def _init_worker(model):
+    # Each worker loads the shared on-disk CKKS context once and keeps the model
+    _worker["context"] = get_ckks_context(galois_keys=False)
+    _worker["model"] = model
+    _worker["rng"] = np.random.default_rng()
+
+def score_batch(values, epsilon=EPSILON):
+    """
+    Packed CKKS round-trip, Laplace noise and IsolationForest scoring for one batch.
+    Returns (decrypted, noisy, is_anomaly) arrays.
+    """
+    if "context" not in _worker:
+        raise RuntimeError("score_batch must run in a worker started with _init_worker")
+    context, model = _worker["context"], _worker["model"]
+    encrypted, layout = pack_readings(context, values)
+    decrypted = unpack_readings(context, encrypted, layout)["value"].to_numpy()
+    noisy = np.maximum(0, laplace_mechanism(decrypted, epsilon, rng=_worker["rng"]))
+    is_anomaly = model.predict(pd.DataFrame({"noisy_kwh": noisy})) == -1
+    return decrypted, noisy, is_anomaly
+
+# ---- counters ----
+
+class StageStats:
+    """Items, batches and latency samples for one pipeline stage."""
+
+    def __init__(self, name, samples=10000):
+        self.name = name
+        self.items = 0
+        self.batches = 0
+        self.busy = 0.0
+        self.latencies = deque(maxlen=samples)
+        self.started = time.perf_counter()
+
+    def record(self, items, seconds, latencies=None):
+        self.items += items
+        self.batches += 1
+        self.busy += seconds
+        if latencies is None:
+            self.latencies.append(seconds)
+        else:
+            self.latencies.extend(latencies)
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        latencies = np.asarray(self.latencies) * 1000 if self.latencies else np.zeros(1)
+        return {
+            "stage": self.name,
+            "items": self.items,
+            "batches": self.batches,
+            "items_per_sec": round(self.items / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+        }
+
+# ---- pipeline ----
+
+class IngestionPipeline:
+    """
+    Asyncio ingestion: producers submit readings into bounded queues partitioned by
+    home_id (so a home's readings stay ordered), one consumer per partition drains
+    micro-batches of up to `batch_size` readings (or whatever arrived within
+    `batch_timeout`) and offloads scoring to a process pool. Full queues make
+    submit() wait, which is the backpressure on producers. Scored rows go to
+    `sinks` (e.g. streaming.open_sinks()).
+    """
+
+    def __init__(self, model, partitions=PARTITIONS, queue_size=QUEUE_SIZE, batch_size=BATCH_SIZE,
+                 batch_timeout=BATCH_TIMEOUT, workers=None, sinks=None, epsilon=EPSILON):
+        self.partitions = partitions
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.epsilon = epsilon
+        self.sinks = sinks or []
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model,))
+        self.stats = {name: StageStats(name) for name in ["enqueue", "score", "sink", "end_to_end"]}
+        self.queues = []
+        self._consumers = []
+
+    def partition(self, home_id):
+        return zlib.crc32(str(home_id).encode()) % self.partitions
+
+    async def start(self):
+        self.queues = [asyncio.Queue(maxsize=self.queue_size) for _ in range(self.partitions)]
+        self._consumers = [asyncio.create_task(self._consume(q)) for q in self.queues]
+
+    async def submit(self, home_id, timestamp, energy_kwh):
+        start = time.perf_counter()
+        await self.queues[self.partition(home_id)].put((home_id, timestamp, energy_kwh, start))
+        self.stats["enqueue"].record(1, time.perf_counter() - start)
+
+    async def _next_batch(self, queue):
+        batch = [await queue.get()]
+        deadline = time.perf_counter() + self.batch_timeout
+        while len(batch) < self.batch_size and batch[-1] is not None:
+            try:
+                batch.append(queue.get_nowait())
+            except asyncio.QueueEmpty:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+        return batch
+
+    async def _consume(self, queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch(queue)
+            done = batch[-1] is None
+            readings = [item for item in batch if item is not None]
+            if readings:
+                homes, timestamps, values, submitted = zip(*readings)
+                start = time.perf_counter()
+                decrypted, noisy, is_anomaly = await loop.run_in_executor(
+                    self.pool, score_batch, np.asarray(values, dtype=float), self.epsilon)
+                scored = time.perf_counter()
+                self.stats["score"].record(len(readings), scored - start)
+
+                rows = pd.DataFrame({
+                    "timestamp": pd.to_datetime(list(timestamps)).strftime("%Y-%m-%d %H:%M:%S"),
+                    "home_id": homes,
+                    "energy_kwh": np.round(decrypted, 2),
+                    "noisy_kwh": np.round(noisy, 2),
+                    "is_anomaly": False,
+                    "is_anomaly_ml": is_anomaly,
+                })
+                for sink in self.sinks:
+                    sink.write(rows)
+                finished = time.perf_counter()
+                self.stats["sink"].record(len(readings), finished - scored)
+                self.stats["end_to_end"].record(len(readings), 0.0, [finished - t for t in submitted])
+            if done:
+                return
+
+    async def drain(self):
+        """Waits for everything submitted so far to be processed, then stops the consumers."""
+        for queue in self.queues:
+            await queue.put(None)
+        await asyncio.gather(*self._consumers)
+        for sink in self.sinks:
+            sink.flush()
+        self.pool.shutdown()
+
+    def report(self):
+        return pd.DataFrame([stats.summary() for stats in self.stats.values()])
+
+# ---- synthetic load ----
+
+async def synthetic_meter(pipeline, home_id, rate_hz, duration, seed=None, spike_prob=0.01):
+    """
+    One simulated meter: submits a reading every 1 / rate_hz seconds for `duration`
+    seconds (household-like base load plus occasional spikes). Returns readings sent.
+    """
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(0.005, 0.03)
+    interval = 1.0 / rate_hz
+    next_at = time.perf_counter() + rng.uniform(0, interval)
+    stop_at = time.perf_counter() + duration
+    sent = 0
+    while next_at < stop_at:
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+        value = base * rng.lognormal(0, 0.3) + (rng.uniform(0.05, 0.15) if rng.random() < spike_prob else 0.0)
+        await pipeline.submit(home_id, pd.Timestamp.now(), value)
+        sent += 1
+        next_at += interval
+    return sent
+
+def train_synthetic_model(samples=20000, seed=42):
+    rng = np.random.default_rng(seed)
+    noisy = np.maximum(0, laplace_mechanism(rng.uniform(0.005, 0.03, samples), EPSILON, rng=rng))
+    model = IsolationForest(contamination=0.1, random_state=42)
+    model.fit(pd.DataFrame({"noisy_kwh": noisy}))
+    return model
+
+async def run_load_test(meters=1000, rate_hz=1.0, duration=10.0, sinks=None, **pipeline_kwargs):
+    pipeline = IngestionPipeline(train_synthetic_model(), sinks=sinks, **pipeline_kwargs)
+    await pipeline.start()
+    start = time.perf_counter()
+    sent = await asyncio.gather(*[
+        synthetic_meter(pipeline, f"home_{i:05d}", rate_hz, duration, seed=i) for i in range(meters)
+    ])
+    await pipeline.drain()
+    elapsed = time.perf_counter() - start
+    print(f"📡 {sum(sent)} readings from {meters} meters in {elapsed:.1f}s ({sum(sent) / elapsed:,.0f} readings/s)")
+    return pipeline.report()
+
+def main():
+    from backend.streaming import open_sinks, clear_outputs
+
+    parser = argparse.ArgumentParser(description="Asyncio ingestion load test with synthetic meters.")
+    parser.add_argument("--meters", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=1.0, help="Readings per second per meter")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds each meter keeps sending")
+    parser.add_argument("--partitions", type=int, default=PARTITIONS)
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--write", action="store_true", help="Write scored rows to the dashboard CSVs")
+    args = parser.parse_args()
+
+    sinks = None
+    if args.write:
+        sinks = open_sinks()
+        clear_outputs(sinks)
+    report = asyncio.run(run_load_test(
+        args.meters, args.rate, args.duration, sinks=sinks, partitions=args.partitions,
+        queue_size=args.queue_size, batch_size=args.batch_size, workers=args.workers,
+    ))
+    print(report.to_string(index=False))
+    for sink in sinks or []:
+        sink.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,12 @@
 # Paste the modular code from STEP 1 here
 # --- Imports ---
-import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 from tensorflow.keras.models import load_model
-import tenseal as ts
+from backend.dataset_cache import load_columns, load_scaler, save_scaler
+from backend.encryption import get_ckks_context as shared_ckks_context, encrypt_values, decrypt_values
 import matplotlib.pyplot as plt
 
 from tensorflow.keras.losses import MeanSquaredError
@@ -13,23 +14,39 @@ from tensorflow.keras.metrics import MeanSquaredError as MSE
 
 # --- 1. Load and preprocess data ---
 def load_and_preprocess(filepath="household_power_consumption.txt"):
-    df = pd.read_csv(filepath, sep=";", na_values="?", low_memory=False)
-    df['Datetime'] = pd.to_datetime(df['Date'] + " " + df['Time'], format="%d/%m/%Y %H:%M:%S")
-    df.set_index("Datetime", inplace=True)
-    df.drop(['Date', 'Time'], axis=1, inplace=True)
-    df = df.astype(float).interpolate()
-    data = df['Global_active_power'].values.reshape(-1, 1)
-    scaler = MinMaxScaler()
-    data_scaled = scaler.fit_transform(data)
+    # Parsed once into memory-mapped columns (see backend/dataset_cache.py)
+    columns = load_columns(filepath, ["Global_active_power"])
+    data = np.asarray(columns["Global_active_power"]).reshape(-1, 1)
+    scaler = load_scaler(filepath, "Global_active_power")
+    if scaler is None:
+        scaler = MinMaxScaler().fit(data)
+        save_scaler(filepath, scaler, "Global_active_power")
+    data_scaled = scaler.transform(data)
     return data_scaled, scaler
 
 # --- 2. Create sequences for LSTM ---
-def create_lstm_sequences(data, window_size=5):
-    X, y = [], []
-    for i in range(len(data) - window_size):
-        X.append(data[i:i+window_size])
-        y.append(data[i+window_size])
-    return np.array(X), np.array(y)
+def create_lstm_sequences(data, window_size=5, start=0, stop=None, tail=None):
+    """
+    Returns (X, y) as read-only views over `data` (no copy): X[i] = data[i:i+window_size]
+    and y[i] = data[i+window_size]. Use `tail` to get only the last n sequences, or
+    `start`/`stop` to get a range of sequence indices.
+    """
+    data = np.asarray(data)
+    n = max(len(data) - window_size, 0)
+    if tail is not None:
+        start, stop = max(n - tail, 0), n
+    start, stop, _ = slice(start, stop).indices(n)
+    stop = max(start, stop)
+
+    # sliding_window_view puts the window axis last; move it next to the sample axis
+    if stop == start:
+        X = np.empty((0, window_size) + data.shape[1:], dtype=data.dtype)
+    else:
+        windows = sliding_window_view(data[start:stop + window_size - 1], window_size, axis=0)
+        X = np.moveaxis(windows, -1, 1)
+    y = data[start + window_size:stop + window_size].view()
+    y.flags.writeable = False
+    return X, y
 
 # --- 3. Load trained LSTM model ---
 from tensorflow.keras.models import load_model
@@ -47,30 +64,40 @@ def load_lstm_model(model_path="nig.h5"):
 
 
 # --- 4. Set up CKKS context ---
-def get_ckks_context():
-    context = ts.context(
-        ts.SCHEME_TYPE.CKKS,
-        poly_modulus_degree=8192,
-        coeff_mod_bit_sizes=[60, 40, 40, 60]
-    )
-    context.global_scale = 2 ** 40
-    context.generate_galois_keys()
-    return context
+# Shared, cached context from backend.encryption (inference only needs encrypt/decrypt)
+def get_ckks_context(galois_keys=False):
+    return shared_ckks_context(galois_keys=galois_keys)
 
 # --- 5. Encrypted inference simulation ---
-def run_encrypted_inference(model, X_test, y_test, scaler, context, max_samples=100):
-    preds, actuals = [], []
-    for i in range(min(len(X_test), max_samples)):
-        sample = X_test[i].flatten()
-        enc_sample = ts.ckks_vector(context, sample)
-        dec_sample = np.array(enc_sample.decrypt()).reshape((5, 1))
-        pred_scaled = model.predict(dec_sample[np.newaxis, :, :])[0][0]
-        pred = scaler.inverse_transform([[pred_scaled]])[0][0]
-        actual = scaler.inverse_transform(y_test[i].reshape(1, -1))[0][0]
-        preds.append(pred)
-        actuals.append(actual)
+def run_encrypted_inference_batch(model, X_test, y_test, scaler, context):
+    """
+    Packs all windows into shared CKKS vectors, runs one forward pass over the whole batch
+    and inverse-transforms vectorially. Returns (actuals, preds) as 1-D arrays.
+    """
+    n = len(X_test)
+    if n == 0:
+        return np.empty(0), np.empty(0)
+    enc_samples = encrypt_values(context, np.asarray(X_test).reshape(-1))
+    dec_samples = decrypt_values(context, enc_samples).reshape(np.shape(X_test))
+    preds_scaled = np.asarray(model(dec_samples.astype("float32"), training=False)).reshape(-1, 1)
+    preds = scaler.inverse_transform(preds_scaled).ravel()
+    actuals = scaler.inverse_transform(np.asarray(y_test).reshape(-1, 1)).ravel()
     return actuals, preds
 
+def iter_encrypted_inference(model, X_test, y_test, scaler, context, chunk_size=256):
+    """
+    Yields (actuals, preds) chunk by chunk so callers can display results progressively.
+    """
+    for start in range(0, len(X_test), chunk_size):
+        yield run_encrypted_inference_batch(
+            model, X_test[start:start + chunk_size], y_test[start:start + chunk_size], scaler, context
+        )
+
+def run_encrypted_inference(model, X_test, y_test, scaler, context, max_samples=100):
+    n = min(len(X_test), max_samples)
+    actuals, preds = run_encrypted_inference_batch(model, X_test[:n], y_test[:n], scaler, context)
+    return actuals.tolist(), preds.tolist()
+
 # --- 6. Evaluate metrics ---
 def evaluate_predictions(actuals, preds):
     mae = mean_absolute_error(actuals, preds)
@@ -1,46 +1,31 @@
 import random
-import networkx as nx
+import numpy as np
+from backend.dijkstra_engine import build_csr, heap_dijkstra
+from backend.grid_graph import edge_arrays, power_weighted_costs, to_networkx
 
 class PowerAwareGraph:
     def __init__(self, num_nodes, edge_list, powers=None):
         self.num_nodes = num_nodes
-        self.graph = nx.Graph()
         self.powers = powers or {i: round(random.uniform(0.5, 2.0), 2) for i in range(num_nodes)}
+        self._graph = None
+        self._csr = None
         self._use_edge_list(edge_list)
 
     def _use_edge_list(self, edge_list):
-        self.graph.add_nodes_from(range(self.num_nodes))
-        for u, v, base_cost in edge_list:
-            power_weighted_cost = round(base_cost / (self.powers[u] * self.powers[v]), 2)
-            self.graph.add_edge(u, v, weight=power_weighted_cost)
+        self.u, self.v, self.base_costs = edge_arrays(edge_list)
+        power = np.array([self.powers[i] for i in range(self.num_nodes)], dtype=float)
+        self.weights = power_weighted_costs(self.u, self.v, self.base_costs, power)
 
-    def dijkstra(self, source):
-        dist = {node: float('inf') for node in self.graph.nodes}
-        dist[source] = 0
-        prev = {node: None for node in self.graph.nodes}
-        visited = set()
-        steps = []
+    @property
+    def graph(self):
+        if self._graph is None:
+            self._graph = to_networkx(self.num_nodes, self.u, self.v, self.weights)
+        return self._graph
 
-        while len(visited) < len(self.graph.nodes):
-            u = min((node for node in self.graph.nodes if node not in visited), key=lambda x: dist[x], default=None)
-            if u is None: break
-            visited.add(u)
-            steps.append((u, dict(dist)))
-            for v in self.graph.neighbors(u):
-                weight = self.graph[u][v]['weight']
-                if dist[u] + weight < dist[v]:
-                    dist[v] = dist[u] + weight
-                    prev[v] = u
-
-        paths = {node: self._reconstruct_path(prev, source, node) for node in self.graph.nodes}
-        return dist, paths, steps
-
-    def _reconstruct_path(self, prev, src, tgt):
-        path = []
-        while tgt is not None:
-            path.insert(0, tgt)
-            tgt = prev[tgt]
-        return path if path[0] == src else []
+    def dijkstra(self, source, trace=False):
+        if self._csr is None:
+            self._csr = build_csr(self.num_nodes, self.u, self.v, self.weights)
+        return heap_dijkstra(*self._csr, source, trace=trace)
 
     def get_graph(self):
         return self.graph
@@ -49,4 +34,4 @@ class PowerAwareGraph:
         return self.powers
 
     def random_source(self):
-        return random.choice(list(self.graph.nodes))
+        return random.randrange(self.num_nodes)
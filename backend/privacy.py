@@ -1,6 +1,141 @@
-import random
+import hashlib
+import json
+import math
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+# Per-home ε spend and the secret seed behind released noise are kept here
+LEDGER_FILE = os.environ.get("SEER_PRIVACY_LEDGER", "data/privacy_ledger.json")
+
+_rng = np.random.default_rng()
+
+class PrivacyBudgetExceeded(ValueError):
+    pass
+
+def laplace_mechanism(values, epsilon=1.0, sensitivity=1.0, rng=None):
+    """ε-DP: adds Laplace(sensitivity / ε) noise to every value in one draw."""
+    rng = rng or _rng
+    values = np.asarray(values, dtype=float)
+    return values + rng.laplace(0.0, sensitivity / epsilon, size=values.shape)
+
+def gaussian_sigma(epsilon, delta=1e-5, sensitivity=1.0):
+    # Classic calibration; the (ε, δ) guarantee only holds for ε < 1
+    if not 0 < epsilon < 1:
+        raise ValueError(f"The classic Gaussian mechanism needs 0 < ε < 1, got ε={epsilon:g}")
+    return sensitivity * math.sqrt(2 * math.log(1.25 / delta)) / epsilon
+
+def gaussian_mechanism(values, epsilon=1.0, delta=1e-5, sensitivity=1.0, rng=None):
+    """(ε, δ)-DP: adds Gaussian noise with gaussian_sigma(ε, δ) to every value in one draw."""
+    rng = rng or _rng
+    values = np.asarray(values, dtype=float)
+    return values + rng.normal(0.0, gaussian_sigma(epsilon, delta, sensitivity), size=values.shape)
 
 def add_laplace_noise(value, epsilon=1.0):
-    scale = 1.0 / epsilon
-    noise = random.gauss(0, scale)  # approx Laplace
-    return value + noise
+    return float(laplace_mechanism(value, epsilon))
+
+def add_laplace_noise_array(values, epsilon=1.0, rng=None):
+    return laplace_mechanism(values, epsilon, rng=rng)
+
+class PrivacyLedger:
+    """
+    Tracks cumulative ε released per home and makes releases repeatable.
+
+    ε is charged per (home, mechanism, ε, δ, time window): the first release that
+    touches a window costs ε for that home, and showing rows from it again costs
+    nothing. Each window's noise comes from one Generator seeded with the ledger's
+    secret seed, the release parameters and the window start, drawn for all of the
+    window's rows at once in timestamp order, so a row always gets the same noisy
+    value (e.g. on a Streamlit rerun, or as its window fills up) and cannot be
+    averaged out. With a `budget`, a release that would push any home past it raises
+    PrivacyBudgetExceeded. State is saved to `path` (owner-only, since the seed
+    lets anyone strip the noise). Safe to share between threads.
+    """
+
+    def __init__(self, path=LEDGER_FILE, budget=None):
+        self.path = path
+        self.budget = budget
+        self._lock = threading.Lock()
+        state = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+        self.seed = state.get("seed", int(np.random.SeedSequence().entropy))
+        self.spent = state.get("spent", {})
+        self.releases = set(state.get("releases", []))
+
+    def _save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"seed": self.seed, "spent": self.spent, "releases": sorted(self.releases)}, f)
+        os.chmod(tmp, 0o600)
+        os.replace(tmp, self.path)
+
+    def remaining(self, home_id):
+        if self.budget is None:
+            return math.inf
+        return self.budget - self.spent.get(home_id, 0.0)
+
+    def reset(self, home_id=None):
+        """Clears the ε spent by one home (every home if None). Released rows keep their noise."""
+        with self._lock:
+            if home_id is None:
+                self.spent, self.releases = {}, set()
+            else:
+                self.spent.pop(home_id, None)
+                self.releases = {key for key in self.releases if not key.startswith(f"{home_id}|")}
+            self._save()
+
+    def release(self, df, epsilon, mechanism="laplace", delta=1e-5, sensitivity=1.0, window="1h",
+                value_col="energy_kwh", home_col="home_id", time_col="timestamp"):
+        """
+        Returns noisy values for the rows of `df` (aligned with df) and charges ε to every
+        home for each `window` of time it has not released before at these parameters.
+        """
+        if mechanism not in ("laplace", "gaussian"):
+            raise ValueError(f"Unknown mechanism: {mechanism}")
+        times = pd.to_datetime(df[time_col])
+        rows = pd.DataFrame({
+            "home": df[home_col].to_numpy(),
+            "window": times.dt.floor(window).to_numpy(dtype="datetime64[ns]").view("i8"),
+            "stamp": times.to_numpy(dtype="datetime64[ns]").view("i8"),
+        })
+        # Rows sharing a timestamp still get independent noise (original order breaks ties)
+        rows = rows.sort_values(["home", "window", "stamp"], kind="stable")
+        order = rows.index.to_numpy()
+        values = df[value_col].to_numpy(dtype=float)
+        noisy = np.empty(len(df))
+        new_keys = {}
+        digests = {}
+        for (home, start), positions in rows.groupby(["home", "window"], sort=False).indices.items():
+            params = f"{home}|{mechanism}|{epsilon:g}|{delta:g}"
+            if params not in digests:
+                digests[params] = int.from_bytes(hashlib.sha256(params.encode()).digest()[:8], "little")
+            rng = np.random.default_rng([self.seed, digests[params], int(start)])
+            window_rows = order[positions]
+            if mechanism == "laplace":
+                noisy[window_rows] = laplace_mechanism(values[window_rows], epsilon, sensitivity, rng)
+            else:
+                noisy[window_rows] = gaussian_mechanism(values[window_rows], epsilon, delta, sensitivity, rng)
+            new_keys[f"{params}|{pd.Timestamp(start).isoformat()}"] = str(home)
+
+        with self._lock:
+            new_keys = {key: home for key, home in new_keys.items() if key not in self.releases}
+            cost = {}
+            for home in new_keys.values():
+                cost[home] = cost.get(home, 0.0) + epsilon
+            for home, amount in cost.items():
+                if self.remaining(home) < amount:
+                    raise PrivacyBudgetExceeded(
+                        f"{home} has ε={self.spent.get(home, 0.0):.2f} of {self.budget:.2f} spent; "
+                        f"releasing {amount / epsilon:.0f} new window(s) at ε={epsilon:g} needs {amount:g}")
+            for key, home in new_keys.items():
+                self.spent[home] = self.spent.get(home, 0.0) + epsilon
+                self.releases.add(key)
+            if new_keys:
+                self._save()
+        return noisy
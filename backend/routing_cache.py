@@ -0,0 +1,133 @@
+# --- backend/routing_cache.py ---
+
+import numpy as np
+from backend.dijkstra_engine import LazyPaths, repair_tree, shortest_path_tree
+
+class _Tree:
+    # Raw dist/prev lists plus the dict/LazyPaths views handed to callers (rebuilt after a repair)
+    def __init__(self, source, dist, prev):
+        self.source = source
+        self.dist = dist
+        self.prev = prev
+        self.views = None
+
+    def get_views(self):
+        if self.views is None:
+            self.views = dict(enumerate(self.dist)), LazyPaths(self.prev, self.source)
+        return self.views
+
+class RoutingCache:
+    """
+    Shortest-path trees for a PowerAwareGraph, kept in sync with the graph version.
+
+    method="dijkstra" builds each source's tree on first request with the heap engine
+    and repairs cached trees incrementally after update_power / update_edge, touching
+    only the affected subtrees. method="floyd" solves all pairs at once with a
+    vectorized Floyd–Warshall (only for graphs up to `floyd_max_nodes`) and is
+    recomputed after any change.
+    """
+
+    def __init__(self, graph, method="dijkstra", floyd_max_nodes=500):
+        if method not in ("dijkstra", "floyd"):
+            raise ValueError(f"Unknown routing method: {method}")
+        self.graph = graph
+        self.method = method
+        self.floyd_max_nodes = floyd_max_nodes
+        self._version = graph.version
+        self._trees = {}
+        self._dist = None
+        self._pred = None
+        self.hits = 0
+        self.misses = 0
+        self.repaired_nodes = 0
+
+    def _check_version(self):
+        if self._version == self.graph.version:
+            return
+        changes = self.graph.changes_since(self._version)
+        self._version = self.graph.version
+        self._dist = None
+        self._pred = None
+        if self.method == "floyd" or changes is None:
+            self._trees = {}
+            return
+        csr = self.graph.get_csr_lists()
+        for tree in self._trees.values():
+            self.repaired_nodes += repair_tree(*csr, tree.dist, tree.prev, changes)
+            tree.views = None
+
+    def invalidate(self):
+        self._trees = {}
+        self._dist = None
+        self._pred = None
+
+    def _tree(self, source):
+        self._check_version()
+        if source in self._trees:
+            self.hits += 1
+            return self._trees[source]
+        self.misses += 1
+
+        if self.method == "floyd":
+            dist, pred = self.all_pairs()
+            tree = _Tree(source, dist[source].tolist(), pred[source].tolist())
+        else:
+            dist, prev, _ = shortest_path_tree(*self.graph.get_csr_lists(), source)
+            tree = _Tree(source, dist, prev)
+        self._trees[source] = tree
+        return tree
+
+    def tree(self, source):
+        """
+        Returns (dist, paths) for `source`, the first two items of graph.dijkstra(source).
+        """
+        return self._tree(source).get_views()
+
+    def cost(self, source, target):
+        return self._tree(source).dist[target]
+
+    def route(self, source, target):
+        tree = self._tree(source)
+        if tree.views is not None:
+            return tree.views[1][target]
+        return LazyPaths(tree.prev, source)[target]
+
+    def all_pairs(self):
+        """
+        Returns (dist, pred) as (n, n) arrays: dist[i, j] is the cheapest cost from i to j
+        and pred[i, j] the node before j on that route (-1 if none).
+        """
+        self._check_version()
+        if self._dist is not None:
+            return self._dist, self._pred
+
+        n = self.graph.num_nodes
+        if self.method == "floyd":
+            if n > self.floyd_max_nodes:
+                raise ValueError(f"Floyd–Warshall limited to {self.floyd_max_nodes} nodes, graph has {n}")
+            self._dist, self._pred = floyd_warshall(n, *self.graph.get_csr())
+        else:
+            dist = np.full((n, n), np.inf)
+            pred = np.full((n, n), -1, dtype=np.int64)
+            for source in range(n):
+                tree = self._tree(source)
+                dist[source] = tree.dist
+                pred[source] = tree.prev
+            self._dist, self._pred = dist, pred
+        return self._dist, self._pred
+
+def floyd_warshall(num_nodes, indptr, indices, weights):
+    dist = np.full((num_nodes, num_nodes), np.inf)
+    pred = np.full((num_nodes, num_nodes), -1, dtype=np.int64)
+    rows = np.repeat(np.arange(num_nodes), np.diff(indptr))
+    dist[rows, indices] = weights
+    pred[rows, indices] = rows
+    np.fill_diagonal(dist, 0.0)
+    np.fill_diagonal(pred, -1)
+
+    for k in range(num_nodes):
+        through_k = dist[:, k, None] + dist[None, k, :]
+        better = through_k < dist
+        dist = np.where(better, through_k, dist)
+        pred = np.where(better, pred[None, k, :], pred)
+    return dist, pred
@@ -0,0 +1,200 @@
+# --- backend/sinks.py ---
+
+import glob
+import os
+import shutil
+import time
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow is optional; only the arrow/parquet formats need it
+    pa = None
+
+FORMATS = {"csv": "csv", "arrow": "arrow", "parquet": "parquet"}
+FLUSH_ROWS = 4096
+FLUSH_INTERVAL = 1.0
+
+class SegmentSink:
+    """
+    Buffered writer for streamed rows.
+
+    Rows are buffered and written once `flush_rows` are waiting or `flush_interval`
+    seconds have passed since the last flush (checked on each write), so a batch is
+    formatted once and written with a single call.
+
+    csv without rotation appends to `path` itself, which keeps the existing dashboard
+    files working. With `segment_rows` / `segment_bytes`, or with the columnar formats,
+    rows go to numbered parts in a directory named after `path` (without extension).
+    CSV parts are append-only and only ever receive whole lines, so tail readers never
+    parse a half-written row. Arrow IPC / Parquet parts are immutable: each flush is
+    written to a temporary file and published with os.replace.
+    """
+
+    def __init__(self, path, fmt="csv", flush_rows=FLUSH_ROWS, flush_interval=FLUSH_INTERVAL,
+                 segment_rows=None, segment_bytes=None):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown sink format: {fmt}")
+        if fmt != "csv" and pa is None:
+            raise ImportError(f"The {fmt} sink needs pyarrow (pip install pyarrow)")
+        self.path = path
+        self.fmt = fmt
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.segment_rows = segment_rows
+        self.segment_bytes = segment_bytes
+        self.segmented = fmt != "csv" or bool(segment_rows or segment_bytes)
+        self.directory = os.path.splitext(path)[0] if self.segmented else None
+
+        self._records = []
+        self._frames = []
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+        self._file = None
+        self._segment = None
+        self._part = None
+        self._segment_rows_written = 0
+        self.rows_written = 0
+        self.flushes = 0
+
+    # ---- buffering ----
+
+    def write_row(self, row):
+        """Buffers one row given as a dict (no per-row DataFrame)."""
+        self._records.append(row)
+        self._buffered += 1
+        self._maybe_flush()
+
+    def write(self, rows):
+        """Buffers a DataFrame of rows."""
+        if len(rows):
+            self._frames.append(rows)
+            self._buffered += len(rows)
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        if self._buffered >= self.flush_rows or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._buffered:
+            return
+        frames = self._frames + ([pd.DataFrame(self._records)] if self._records else [])
+        batch = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0].reset_index(drop=True)
+        self._records, self._frames, self._buffered = [], [], 0
+
+        if self.fmt == "csv":
+            self._write_csv(batch)
+        else:
+            step = self.segment_rows or len(batch)
+            for start in range(0, len(batch), step):
+                self._publish_part(batch.iloc[start:start + step])
+        self.rows_written += len(batch)
+        self.flushes += 1
+
+    # ---- csv ----
+
+    def _next_part(self, ext):
+        os.makedirs(self.directory, exist_ok=True)
+        if self._part is None:
+            # Continue numbering after parts left by an earlier run
+            parts = glob.glob(os.path.join(self.directory, f"part-*.{ext}"))
+            self._part = max((int(os.path.basename(p)[5:10]) for p in parts), default=-1)
+        self._part += 1
+        return os.path.join(self.directory, f"part-{self._part:05d}.{ext}")
+
+    def _rotate_due(self):
+        if self._file is None:
+            return True
+        if self.segment_rows and self._segment_rows_written >= self.segment_rows:
+            return True
+        if self.segment_bytes and self._file.tell() >= self.segment_bytes:
+            return True
+        return False
+
+    def _open_csv(self):
+        if self._file is not None:
+            self._file.close()
+        self._segment = self._next_part("csv") if self.segmented else self.path
+        directory = os.path.dirname(self._segment)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self._segment, "a", newline="")
+        self._segment_rows_written = 0
+
+    def _write_csv(self, batch):
+        start = 0
+        while start < len(batch):
+            if self.segmented:
+                reopen = self._rotate_due()
+            else:
+                reopen = self._file is None or not os.path.exists(self._segment)
+            if reopen:
+                self._open_csv()
+            room = len(batch) - start
+            if self.segment_rows:
+                room = min(room, self.segment_rows - self._segment_rows_written)
+            chunk = batch.iloc[start:start + room]
+            # One write of whole lines per chunk; readers only ever see complete rows
+            self._file.write(chunk.to_csv(header=self._file.tell() == 0, index=False))
+            self._file.flush()
+            self._segment_rows_written += len(chunk)
+            start += len(chunk)
+
+    # ---- columnar ----
+
+    def _publish_part(self, rows):
+        target = self._next_part(FORMATS[self.fmt])
+        tmp = f"{target}.{os.getpid()}.tmp"
+        table = pa.Table.from_pandas(rows, preserve_index=False)
+        if self.fmt == "arrow":
+            feather.write_feather(table, tmp, compression="lz4")
+        else:
+            import pyarrow.parquet as pq
+            pq.write_table(table, tmp)
+        os.replace(tmp, target)
+
+    # ---- lifecycle ----
+
+    def close(self):
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def clear(self):
+        """Drops everything written so far (file or segment directory)."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._records, self._frames, self._buffered = [], [], 0
+        if self.segmented:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self._part = None
+        elif os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def read_segments(path, fmt="csv"):
+    """
+    Loads everything a SegmentSink wrote for `path`: the file itself for unsegmented
+    CSV, otherwise every published part in order (temporary files are skipped).
+    """
+    directory = os.path.splitext(path)[0]
+    ext = FORMATS[fmt]
+    parts = sorted(glob.glob(os.path.join(directory, f"part-*.{ext}")))
+    if fmt == "csv":
+        files = parts or ([path] if os.path.exists(path) else [])
+        frames = [pd.read_csv(p) for p in files]
+    elif fmt == "arrow":
+        frames = [feather.read_feather(p) for p in parts]
+    else:
+        frames = [pd.read_parquet(p) for p in parts]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
@@ -1,36 +1,302 @@
+import itertools
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
 from datetime import datetime
 
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; the pure-Python loop below is the fallback
+    njit = None
+
+# Action codes stored in the "action" column; formatted to text only for displayed rows
+ACTIONS = ["Charge", "Discharge", "Idle"]
+CHARGE, DISCHARGE, IDLE = 0, 1, 2
+
+# Time-of-use multipliers on the base price: off-peak night, evening peak
+OFF_PEAK_HOURS = (22, 6)
+PEAK_HOURS = (18, 22)
+OFF_PEAK_FACTOR = 0.75
+PEAK_FACTOR = 1.5
+
 def simulate_solar_generation(timestamps):
     """Simulate solar generation curve with higher generation in daytime."""
-    return [
-        max(0, 2 * np.sin((ts.hour - 6) * np.pi / 12))  # Peak around noon
-        for ts in timestamps
-    ]
+    hours = pd.DatetimeIndex(timestamps).hour.to_numpy()
+    return np.maximum(0, 2 * np.sin((hours - 6) * np.pi / 12))  # Peak around noon
+
+def _dispatch_python(net, capacity_kwh, charge_rate, discharge_rate, initial_soc):
+    soc = float(initial_soc)
+    socs, amounts = [], []
+    for x in net.tolist():
+        if x > 0:  # Consumption exceeds solar
+            amount = min(discharge_rate, soc, x)
+            soc -= amount
+        else:  # Excess solar, try to store
+            amount = min(charge_rate, capacity_kwh - soc, -x)
+            soc += amount
+        socs.append(soc)
+        amounts.append(amount)
+    return np.array(socs), np.array(amounts)
+
+if njit is not None:
+    @njit(cache=True)
+    def _dispatch_numba(net, capacity_kwh, charge_rate, discharge_rate, initial_soc):
+        socs = np.empty(len(net))
+        amounts = np.empty(len(net))
+        soc = initial_soc
+        for i in range(len(net)):
+            x = net[i]
+            if x > 0:
+                amount = min(discharge_rate, soc, x)
+                soc -= amount
+            else:
+                amount = min(charge_rate, capacity_kwh - soc, -x)
+                soc += amount
+            socs[i] = soc
+            amounts[i] = amount
+        return socs, amounts
+
+def _dispatch_many_python(net, capacity_kwh, charge_rate, discharge_rate, initial_soc):
+    # Same recurrence, broadcast over the configuration axis: one NumPy step per timestamp
+    soc = initial_soc.copy()
+    charged = np.zeros_like(soc)
+    discharged = np.zeros_like(soc)
+    for x in net.tolist():
+        if x > 0:
+            amount = np.minimum(np.minimum(discharge_rate, soc), x)
+            soc -= amount
+            discharged += amount
+        else:
+            amount = np.minimum(np.minimum(charge_rate, capacity_kwh - soc), -x)
+            soc += amount
+            charged += amount
+    return soc, charged, discharged
+
+if njit is not None:
+    @njit(cache=True)
+    def _dispatch_many_numba(net, capacity_kwh, charge_rate, discharge_rate, initial_soc):
+        n = len(capacity_kwh)
+        final_soc = np.empty(n)
+        charged = np.zeros(n)
+        discharged = np.zeros(n)
+        for c in range(n):
+            soc = initial_soc[c]
+            for i in range(len(net)):
+                x = net[i]
+                if x > 0:
+                    amount = min(discharge_rate[c], soc, x)
+                    soc -= amount
+                    discharged[c] += amount
+                else:
+                    amount = min(charge_rate[c], capacity_kwh[c] - soc, -x)
+                    soc += amount
+                    charged[c] += amount
+            final_soc[c] = soc
+        return final_soc, charged, discharged
+
+def _dispatch_many(args):
+    if njit is not None:
+        return _dispatch_many_numba(*args)
+    return _dispatch_many_python(*args)
+
+def dispatch_battery(net_usage, capacity_kwh=10, charge_rate=2, discharge_rate=2, initial_soc=0):
+    """
+    Runs the greedy SOC recurrence over an array of net usage.
+    Returns (soc_kwh, action_kwh) arrays; the action is DISCHARGE where net usage > 0, else CHARGE.
+    """
+    net = np.ascontiguousarray(net_usage, dtype=np.float64)
+    if njit is not None:
+        return _dispatch_numba(net, float(capacity_kwh), float(charge_rate), float(discharge_rate), float(initial_soc))
+    return _dispatch_python(net, capacity_kwh, charge_rate, discharge_rate, initial_soc)
+
+def time_of_use_prices(timestamps, price_per_kwh=6.0):
+    """Price per kWh for each timestamp: off-peak nights, peak evenings, base price otherwise."""
+    hours = pd.DatetimeIndex(timestamps).hour.to_numpy()
+    prices = np.full(len(hours), float(price_per_kwh))
+    prices[(hours >= OFF_PEAK_HOURS[0]) | (hours < OFF_PEAK_HOURS[1])] *= OFF_PEAK_FACTOR
+    prices[(hours >= PEAK_HOURS[0]) & (hours < PEAK_HOURS[1])] *= PEAK_FACTOR
+    return prices
+
+def _kinks(value, dx, slope):
+    """First and last grid SOC minimizing value + slope * soc (value is convex and piecewise linear)."""
+    shifted = value + slope * dx * np.arange(len(value))
+    best = shifted.min()
+    ties = np.flatnonzero(shifted <= best + 1e-9 * max(1.0, abs(best)))
+    return ties[0] * dx, ties[-1] * dx
+
+def plan_battery_dp(net_usage, prices, capacity_kwh=10, charge_rate=2, discharge_rate=2, initial_soc=0, soc_levels=101):
+    """
+    Cost-minimizing schedule by backward dynamic programming over SOC.
+
+    Each step pays prices[t] * max(0, net_usage[t] + soc_change) for grid import (the
+    battery may charge from the grid; export earns nothing) with the SOC held in
+    [0, capacity_kwh] and the change bounded by the charge/discharge rates. Charge and
+    discharge amounts are continuous: the cost-to-go is kept on `soc_levels` grid
+    points and linearly interpolated between them. It is convex, so the best next
+    SOC from any state is the interval between the kinks of the value function and
+    of the import cost, clipped to the rate band; each step is O(soc_levels) and a
+    1440-step horizon plans in a few tens of milliseconds. Returns the soc_kwh array
+    after each step.
+    """
+    net = np.asarray(net_usage, dtype=np.float64)
+    prices = np.asarray(prices, dtype=np.float64)
+    capacity_kwh = float(capacity_kwh)
+    if capacity_kwh <= 0 or not len(net):
+        return np.zeros(len(net))
+    levels = max(int(soc_levels), 2)
+    dx = capacity_kwh / (levels - 1)
+    soc = np.arange(levels) * dx
+    low = np.maximum(0.0, soc - discharge_rate)
+    high = np.minimum(capacity_kwh, soc + charge_rate)
+
+    # kinks[t] = (A_lo, A_hi, B_lo, B_hi): minimizers of V_{t+1} and of V_{t+1} + prices[t] * soc
+    kinks = np.empty((len(net), 4))
+    value = np.zeros(levels)
+    for t in range(len(net) - 1, -1, -1):
+        kinks[t, :2] = _kinks(value, dx, 0.0)
+        kinks[t, 2:] = _kinks(value, dx, prices[t])
+        nxt = _best_next(soc, net[t], kinks[t], low, high)
+        value = prices[t] * np.maximum(0.0, net[t] + nxt - soc) + np.interp(nxt, soc, value)
+
+    current = min(max(float(initial_soc), 0.0), capacity_kwh)
+    states = np.empty(len(net))
+    for t in range(len(net)):
+        current = float(_best_next(current, net[t], kinks[t], max(0.0, current - discharge_rate),
+                                   min(capacity_kwh, current + charge_rate)))
+        states[t] = current
+    return states
 
-def optimize_battery_operation(data, capacity_kwh=10, charge_rate=2, discharge_rate=2, initial_soc=0, price_per_kwh=6.0):
+def _best_next(soc, net, kinks, low, high):
+    # Minimizers of price * max(0, net + y - soc) + V(y) form [lower, upper]; take the one
+    # closest to the current SOC (no needless cycling), then respect the rate band
+    a_lo, a_hi, b_lo, b_hi = kinks
+    kink = soc - net
+    lower = np.clip(kink, b_lo, a_lo)
+    upper = np.clip(kink, b_hi, a_hi)
+    return np.clip(np.clip(soc, lower, upper), low, high)
+
+def schedule_battery_optimal(net_usage, prices, capacity_kwh=10, charge_rate=2, discharge_rate=2, initial_soc=0,
+                             horizon=1440, replan_every=None, soc_levels=101):
+    """
+    Rolling-horizon wrapper around plan_battery_dp: plans `horizon` steps ahead, commits
+    the first `replan_every` (default: the whole horizon) and re-plans from the SOC reached.
+    Returns (soc_kwh, action_kwh) arrays like dispatch_battery.
+    """
+    net = np.asarray(net_usage, dtype=np.float64)
+    prices = np.broadcast_to(np.asarray(prices, dtype=np.float64), net.shape)
+    replan_every = replan_every or horizon
+    soc = np.empty(len(net))
+    start, current = 0, float(initial_soc)
+    while start < len(net):
+        stop = min(start + horizon, len(net))
+        plan = plan_battery_dp(net[start:stop], prices[start:stop], capacity_kwh, charge_rate,
+                               discharge_rate, current, soc_levels)
+        commit = min(replan_every, len(plan))
+        soc[start:start + commit] = plan[:commit]
+        current = plan[commit - 1]
+        start += commit
+    first = min(max(float(initial_soc), 0.0), float(capacity_kwh))
+    amounts = np.abs(np.diff(soc, prepend=first))
+    return soc, amounts
+
+def format_actions(data):
+    """Formats the action code/amount columns as text, e.g. 'Discharge 0.42 kWh'."""
+    names = np.array(ACTIONS)[data["action"].cat.codes.to_numpy()]
+    return pd.Series(
+        [f"{name} {amount:.2f} kWh" for name, amount in zip(names, data["action_kwh"].to_numpy())],
+        index=data.index,
+    )
+
+def avoided_cost(net, soc_change, prices):
+    """Grid bill avoided at each step versus no battery (the savings_rs column of both schedulers)."""
+    return prices * (np.maximum(0.0, net) - np.maximum(0.0, net + soc_change))
+
+def optimize_battery_operation(data, capacity_kwh=10, charge_rate=2, discharge_rate=2, initial_soc=0, price_per_kwh=6.0,
+                               prices=None):
+    """
+    Greedy dispatch (discharge into load, charge from solar surplus). `prices` is an
+    optional per-row price series (default: flat price_per_kwh); savings_rs is the grid
+    bill avoided at each step versus no battery, as in optimize_battery_schedule.
+    """
     data = data.copy()
     data["solar_kwh"] = simulate_solar_generation(data["timestamp"])
     data["net_usage_kwh"] = data["energy_kwh"] - data["solar_kwh"]
 
-    soc = initial_soc
-    actions = []
+    net = data["net_usage_kwh"].to_numpy()
+    soc, amounts = dispatch_battery(net, capacity_kwh, charge_rate, discharge_rate, initial_soc)
 
-    for _, row in data.iterrows():
-        net = row["net_usage_kwh"]
-        if net > 0:  # Consumption exceeds solar
-            discharge = min(discharge_rate, soc, net)
-            soc -= discharge
-            action = f"Discharge {discharge:.2f} kWh"
-        else:  # Excess solar, try to store
-            charge = min(charge_rate, capacity_kwh - soc, -net)
-            soc += charge
-            action = f"Charge {charge:.2f} kWh"
-        actions.append((soc, action))
+    data["soc_kwh"] = soc
+    data["action"] = pd.Categorical.from_codes(np.where(net > 0, DISCHARGE, CHARGE), categories=ACTIONS)
+    data["action_kwh"] = amounts
+    prices = np.full(len(net), float(price_per_kwh)) if prices is None else np.asarray(prices, dtype=np.float64)
+    data["savings_rs"] = avoided_cost(net, np.diff(soc, prepend=min(max(float(initial_soc), 0.0), float(capacity_kwh))),
+                                      prices)
+
+    return data[["timestamp", "energy_kwh", "solar_kwh", "net_usage_kwh", "soc_kwh", "action", "action_kwh", "savings_rs"]]
+
+def optimize_battery_schedule(data, capacity_kwh=10, charge_rate=2, discharge_rate=2, initial_soc=0, price_per_kwh=6.0,
+                              prices=None, horizon=1440, replan_every=None, soc_levels=101):
+    """
+    Price-aware counterpart of optimize_battery_operation with the same output columns.
+    `prices` is a per-row price series (defaults to time_of_use_prices around
+    price_per_kwh); savings_rs is the grid bill avoided at each step versus no battery.
+    """
+    data = data.copy()
+    data["solar_kwh"] = simulate_solar_generation(data["timestamp"])
+    data["net_usage_kwh"] = data["energy_kwh"] - data["solar_kwh"]
+    if prices is None:
+        prices = time_of_use_prices(data["timestamp"], price_per_kwh)
+
+    net = data["net_usage_kwh"].to_numpy(dtype=np.float64)
+    soc, amounts = schedule_battery_optimal(net, prices, capacity_kwh, charge_rate, discharge_rate,
+                                            initial_soc, horizon, replan_every, soc_levels)
+    change = np.diff(soc, prepend=min(max(float(initial_soc), 0.0), float(capacity_kwh)))
+
+    data["soc_kwh"] = soc
+    codes = np.where(change > 1e-9, CHARGE, np.where(change < -1e-9, DISCHARGE, IDLE))
+    data["action"] = pd.Categorical.from_codes(codes, categories=ACTIONS)
+    data["action_kwh"] = amounts
+    data["savings_rs"] = avoided_cost(net, change, np.broadcast_to(np.asarray(prices, dtype=np.float64), net.shape))
+
+    return data[["timestamp", "energy_kwh", "solar_kwh", "net_usage_kwh", "soc_kwh", "action", "action_kwh", "savings_rs"]]
+
+def sweep_battery_configurations(data, capacities, charge_rates, discharge_rates, prices=(6.0,),
+                                 initial_soc=0, workers=None):
+    """
+    Evaluates every (capacity, charge_rate, discharge_rate, price) combination over the same
+    load profile. Solar and net usage are computed once; the SOC recurrence runs once per
+    physical configuration, broadcast across all of them (and split over `workers`
+    processes if given). Price only scales the result, so it never re-runs the recurrence.
+
+    Returns one row per combination with total_savings_rs (the greedy scheduler's avoided bill at a flat price),
+    charged_kwh, discharged_kwh and final_soc_kwh; pivot it to get a savings surface.
+    """
+    net = (data["energy_kwh"].to_numpy(dtype=np.float64)
+           - simulate_solar_generation(data["timestamp"]))
+    net = np.ascontiguousarray(net)
+    configs = np.array(list(itertools.product(capacities, charge_rates, discharge_rates)), dtype=np.float64)
+    capacity, charge, discharge = configs.T.copy()
+    initial = np.minimum(float(initial_soc), capacity)
 
-    data["soc_kwh"] = [a[0] for a in actions]
-    data["action"] = [a[1] for a in actions]
-    data["savings_rs"] = data["soc_kwh"].diff().fillna(0) * price_per_kwh
+    if workers and workers > 1 and len(configs) > 1:
+        chunks = np.array_split(np.arange(len(configs)), workers)
+        jobs = [(net, capacity[c], charge[c], discharge[c], initial[c]) for c in chunks if len(c)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_dispatch_many, jobs))
+        final_soc, charged, discharged = (np.concatenate(p) for p in zip(*parts))
+    else:
+        final_soc, charged, discharged = _dispatch_many((net, capacity, charge, discharge, initial))
 
-    return data[["timestamp", "energy_kwh", "solar_kwh", "net_usage_kwh", "soc_kwh", "action", "savings_rs"]]
+    physical = pd.DataFrame({
+        "capacity_kwh": capacity,
+        "charge_rate": charge,
+        "discharge_rate": discharge,
+        "charged_kwh": charged,
+        "discharged_kwh": discharged,
+        "final_soc_kwh": final_soc,
+    })
+    result = physical.merge(pd.DataFrame({"price_per_kwh": list(prices)}), how="cross")
+    # Greedy discharge never exceeds the load and charging only uses surplus, so the avoided
+    # bill (optimize_battery_operation's savings_rs) is the discharged energy times price
+    result["total_savings_rs"] = result["discharged_kwh"] * result["price_per_kwh"]
+    return result
@@ -1,12 +1,16 @@
 # --- backend/streaming.py ---
 
+import argparse
 import pandas as pd
+import numpy as np
 import time
 from datetime import datetime
-import os
 from sklearn.ensemble import IsolationForest
-from backend.privacy import add_laplace_noise
-from backend.encryption import get_ckks_context, encrypt_value, decrypt_value
+from backend.dataset_cache import load_columns
+from backend.privacy import add_laplace_noise, add_laplace_noise_array
+from backend.encryption import get_ckks_context, encrypt_value, decrypt_value, pack_readings, unpack_readings
+from backend.encrypted_store import EncryptedStore
+from backend.sinks import SegmentSink, FLUSH_ROWS, FLUSH_INTERVAL
 
 # ⚙️ Parameters
 INPUT_FILE = "data/household_power_consumption.txt"
@@ -14,52 +18,145 @@ OUTPUT_FILE = "decrypted/anomaly_results.csv"
 DECRYPTED_OUTPUT = "decrypted/decrypted_usage.csv"
 EPSILON = 1.5
 HOMES = ["home_001", "home_002", "home_003"]
+BATCH_SIZE = 4096
+STREAM_DELAY = 2.0
 
-# Load CKKS context
-context = get_ckks_context()
-
-# Load and preprocess dataset
-df = pd.read_csv(INPUT_FILE, sep=";", low_memory=False)
-df = df.replace('?', pd.NA).dropna()
-df["timestamp"] = pd.to_datetime(df["Date"] + " " + df["Time"], format="%d/%m/%Y %H:%M:%S")
-df["Global_active_power"] = df["Global_active_power"].astype(float)
-df["energy_kwh"] = df["Global_active_power"] / 60.0
-df["home_id"] = [HOMES[i % len(HOMES)] for i in range(len(df))]
-df = df[["timestamp", "home_id", "energy_kwh"]]
-
-# Add Laplace noise and train on noisy data
-df["noisy_kwh"] = df["energy_kwh"].apply(lambda x: max(0, add_laplace_noise(x, epsilon=EPSILON)))
-model = IsolationForest(contamination=0.1, random_state=42)
-model.fit(df[["noisy_kwh"]])
-print("✅ Anomaly model trained on noisy data.")
-
-# Clear old output
-for path in [OUTPUT_FILE, DECRYPTED_OUTPUT]:
-    if os.path.exists(path):
-        os.remove(path)
-
-# Start streaming
-print("🚀 Streaming started...")
-
-for _, row in df.iterrows():
-    encrypted = encrypt_value(context, row["energy_kwh"])
-    decrypted = decrypt_value(context, encrypted)
-    noisy = max(0, add_laplace_noise(decrypted, epsilon=EPSILON))
-    is_anomaly = model.predict([[noisy]])[0] == -1
-
-    row_data = {
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "home_id": row["home_id"],
-        "energy_kwh": round(decrypted, 2),
-        "noisy_kwh": round(noisy, 2),
-        "is_anomaly": False,
-        "is_anomaly_ml": is_anomaly
-    }
-
-    for path in [OUTPUT_FILE, DECRYPTED_OUTPUT]:
-        write_mode = "a" if os.path.exists(path) else "w"
-        header = not os.path.exists(path)
-        pd.DataFrame([row_data]).to_csv(path, mode=write_mode, header=header, index=False)
-
-    print("📡 Streamed:", row_data)
-    time.sleep(2)
+def load_dataset(path=INPUT_FILE):
+    # Memory-mapped columns from the ingest cache; rows that had missing values are skipped
+    columns = load_columns(path, ["timestamp", "missing", "Global_active_power"])
+    keep = ~columns["missing"]
+    df = pd.DataFrame({
+        "timestamp": columns["timestamp"][keep],
+        "energy_kwh": columns["Global_active_power"][keep] / 60.0,
+    })
+    df["home_id"] = np.array(HOMES)[np.arange(len(df)) % len(HOMES)]
+    return df[["timestamp", "home_id", "energy_kwh"]]
+
+def train_anomaly_model(df):
+    # Add Laplace noise and train on noisy data
+    noisy = np.maximum(0, add_laplace_noise_array(df["energy_kwh"].to_numpy(), epsilon=EPSILON))
+    model = IsolationForest(contamination=0.1, random_state=42)
+    model.fit(pd.DataFrame({"noisy_kwh": noisy}))
+    return model
+
+def open_sinks(fmt="csv", flush_rows=FLUSH_ROWS, flush_interval=FLUSH_INTERVAL, segment_rows=None):
+    """One buffered sink per output file; plain CSV keeps the files the dashboard reads."""
+    return [SegmentSink(path, fmt, flush_rows, flush_interval, segment_rows) for path in [OUTPUT_FILE, DECRYPTED_OUTPUT]]
+
+def clear_outputs(sinks):
+    for sink in sinks:
+        sink.clear()
+
+def append_rows(sinks, rows):
+    for sink in sinks:
+        sink.write(rows)
+
+def stream_realtime(df, model, context, sinks, delay=STREAM_DELAY):
+    """
+    Streams one reading at a time, pacing output by `delay` seconds (None or 0 disables pacing).
+    """
+    for _, row in df.iterrows():
+        encrypted = encrypt_value(context, row["energy_kwh"])
+        decrypted = decrypt_value(context, encrypted)
+        noisy = max(0, add_laplace_noise(decrypted, epsilon=EPSILON))
+        is_anomaly = model.predict(pd.DataFrame({"noisy_kwh": [noisy]}))[0] == -1
+
+        row_data = {
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "home_id": row["home_id"],
+            "energy_kwh": round(decrypted, 2),
+            "noisy_kwh": round(noisy, 2),
+            "is_anomaly": False,
+            "is_anomaly_ml": is_anomaly
+        }
+        for sink in sinks:
+            sink.write_row(row_data)
+
+        print("📡 Streamed:", row_data)
+        if delay:
+            time.sleep(delay)
+
+def replay(df, model, context, sinks, batch_size=BATCH_SIZE, max_rows_per_sec=None, rng=None, store=None):
+    """
+    Backfills the dataset in micro-batches: packed CKKS round-trip, vectorized noise,
+    one IsolationForest call and one append per batch. With an EncryptedStore the
+    packed ciphertexts are also persisted before decryption. Returns overall rows/second.
+    """
+    rng = rng or np.random.default_rng()
+    start = time.perf_counter()
+    processed = 0
+
+    for offset in range(0, len(df), batch_size):
+        batch = df.iloc[offset:offset + batch_size]
+        encrypted, layout = pack_readings(
+            context, batch["energy_kwh"].to_numpy(),
+            home_ids=batch["home_id"].to_numpy(), timestamps=batch["timestamp"].to_numpy()
+        )
+        if store is not None:
+            store.append_packed(encrypted, layout)
+        decrypted = unpack_readings(context, encrypted, layout)["value"].to_numpy()
+        noisy = np.maximum(0, add_laplace_noise_array(decrypted, epsilon=EPSILON, rng=rng))
+        is_anomaly = model.predict(pd.DataFrame({"noisy_kwh": noisy})) == -1
+
+        append_rows(sinks, pd.DataFrame({
+            "timestamp": batch["timestamp"].dt.strftime("%Y-%m-%d %H:%M:%S").to_numpy(),
+            "home_id": batch["home_id"].to_numpy(),
+            "energy_kwh": np.round(decrypted, 2),
+            "noisy_kwh": np.round(noisy, 2),
+            "is_anomaly": False,
+            "is_anomaly_ml": is_anomaly
+        }))
+        processed += len(batch)
+
+        # Optional rate limit: sleep until we are back under the target rate
+        if max_rows_per_sec:
+            ahead = processed / max_rows_per_sec - (time.perf_counter() - start)
+            if ahead > 0:
+                time.sleep(ahead)
+
+        elapsed = time.perf_counter() - start
+        print(f"📦 Replayed {processed}/{len(df)} rows ({processed / elapsed:,.0f} rows/s)")
+
+    elapsed = time.perf_counter() - start
+    return processed / elapsed if elapsed > 0 else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream or replay smart meter readings.")
+    parser.add_argument("--replay", action="store_true", help="Backfill in micro-batches instead of streaming row by row")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--rate", type=float, default=None, help="Replay rate limit in rows/second")
+    parser.add_argument("--delay", type=float, default=STREAM_DELAY, help="Seconds between real-time readings")
+    parser.add_argument("--store", default=None, help="Also persist packed ciphertexts to this encrypted store (replay only)")
+    parser.add_argument("--sink-format", choices=["csv", "arrow", "parquet"], default="csv",
+                        help="arrow/parquet write immutable segments next to the CSV paths (needs pyarrow)")
+    parser.add_argument("--flush-rows", type=int, default=FLUSH_ROWS, help="Flush after this many buffered rows")
+    parser.add_argument("--flush-interval", type=float, default=FLUSH_INTERVAL, help="Flush at least this often (seconds)")
+    parser.add_argument("--segment-rows", type=int, default=None, help="Rotate output segments after this many rows")
+    args = parser.parse_args()
+
+    # Load CKKS context (the stored ciphertexts are summed with rotations later, so keep Galois keys then)
+    context = get_ckks_context(galois_keys=bool(args.store))
+
+    df = load_dataset()
+    model = train_anomaly_model(df)
+    print("✅ Anomaly model trained on noisy data.")
+
+    # Clear old output
+    sinks = open_sinks(args.sink_format, args.flush_rows, args.flush_interval, args.segment_rows)
+    clear_outputs(sinks)
+
+    try:
+        if args.replay:
+            print("⏩ Replay started...")
+            store = EncryptedStore(args.store, context) if args.store else None
+            rate = replay(df, model, context, sinks, batch_size=args.batch_size, max_rows_per_sec=args.rate, store=store)
+            print(f"✅ Replay finished at {rate:,.0f} rows/s")
+        else:
+            print("🚀 Streaming started...")
+            stream_realtime(df, model, context, sinks, delay=args.delay)
+    finally:
+        for sink in sinks:
+            sink.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+# --- backend/tail_reader.py ---
+
+import glob
+import hashlib
+import io
+import os
+import shutil
+import threading
+import weakref
+import numpy as np
+import pandas as pd
+
+SPILL_DIR = "data/spill"
+WINDOW_ROWS = 1_000_000
+# Leading bytes compared on every poll to tell an appended file from a replaced one
+FINGERPRINT_BYTES = 4096
+
+_readers = {}
+_readers_lock = threading.Lock()
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # No permission to signal it (or no such check on this platform): treat as alive
+        return True
+    return True
+
+def _drop_stale_spills(prefix):
+    for directory in glob.glob(f"{glob.escape(prefix)}*"):
+        pid = directory[len(prefix):]
+        if pid.isdigit() and int(pid) != os.getpid() and not _pid_alive(int(pid)):
+            shutil.rmtree(directory, ignore_errors=True)
+
+class CsvTailReader:
+    """
+    Incrementally parses an append-only CSV (the files streaming.py writes).
+
+    Remembers the byte offset of the last complete line and only parses bytes
+    appended since, keeping the parsed frame plus per-home views in memory. A
+    partially written last line is left for the next read. If the file is replaced
+    (streaming clears its outputs on start) everything is re-read; a replacement is
+    a different (device, inode), a shorter file, or different leading bytes, since
+    a recreated file often gets the old inode number back. While the file is
+    missing, reads return no rows.
+
+    Only the newest `max_rows` rows stay in memory (None keeps everything); older rows are spilled to
+    numbered columnar `.npz` parts under `spill_dir` (one directory per source file and process) and
+    come back via history(). The directory is removed when the reader is garbage collected or the
+    process exits, and directories left by processes that died without cleaning up are removed
+    when a reader for the same file starts.
+    """
+
+    def __init__(self, path, parse_dates=("timestamp",), dtypes=None, key_col="home_id",
+                 max_rows=WINDOW_ROWS, spill_dir=SPILL_DIR):
+        self.path = path
+        self.parse_dates = list(parse_dates)
+        self.dtypes = dict(dtypes or {})
+        self.key_col = key_col
+        self.max_rows = max_rows
+        name = os.path.splitext(os.path.basename(path))[0]
+        source = hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:8]
+        prefix = os.path.join(spill_dir, f"{name}-{source}-")
+        self.spill_dir = f"{prefix}{os.getpid()}"
+        self._lock = threading.Lock()
+        self._clear()
+        _drop_stale_spills(prefix)
+        # Parts left by an earlier process with the same pid; this reader re-reads from the start
+        self._drop_spill()
+        weakref.finalize(self, shutil.rmtree, self.spill_dir, ignore_errors=True)
+
+    def _clear(self):
+        self._offset = 0
+        self._identity = None
+        self._head = b""
+        self._missing = False
+        self._columns = None
+        self._chunks = []
+        self._frame = None
+        self._homes = {}
+        self._home_frames = {}
+        self._first_row = 0
+        self._rows = 0
+        self._spilled = 0
+
+    def _drop_spill(self):
+        for part in glob.glob(os.path.join(self.spill_dir, "part-*.npz")):
+            os.remove(part)
+
+    def _reset(self):
+        # Only for a confirmed replacement: the spilled rows belong to the old file
+        self._clear()
+        self._drop_spill()
+
+    def _parse(self, data):
+        chunk = pd.read_csv(io.BytesIO(data), header=None, names=self._columns, dtype=self.dtypes or None)
+        for column in self.parse_dates:
+            chunk[column] = pd.to_datetime(chunk[column])
+        chunk.index = pd.RangeIndex(self._rows, self._rows + len(chunk))
+        self._rows += len(chunk)
+        return chunk
+
+    def _poll(self):
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            self._missing = True
+            return
+        with f:
+            stat = os.fstat(f.fileno())
+            identity = (stat.st_dev, stat.st_ino)
+            if self._offset and (identity != self._identity or stat.st_size < self._offset
+                                 or f.read(len(self._head)) != self._head):
+                self._reset()
+            self._identity = identity
+            self._missing = False
+            if stat.st_size == self._offset:
+                return
+            f.seek(self._offset)
+            data = f.read(stat.st_size - self._offset)
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            return
+        data = data[:end]
+        self._offset += end
+        if len(self._head) < FINGERPRINT_BYTES:
+            self._head = (self._head + data)[:FINGERPRINT_BYTES]
+
+        if self._columns is None:
+            header, _, data = data.partition(b"\n")
+            self._columns = header.decode().strip().split(",")
+            if not data:
+                return
+        chunk = self._parse(data)
+        self._chunks.append(chunk)
+        if self.key_col in chunk:
+            for home, rows in chunk.groupby(self.key_col, sort=False):
+                self._homes.setdefault(home, []).append(rows)
+                self._home_frames.pop(home, None)
+
+        if self.max_rows and self._rows - self._first_row > self.max_rows:
+            self._spill()
+
+    def _spill(self):
+        frame = self._collect()
+        cut = len(frame) - self.max_rows
+        old, self._frame = frame.iloc[:cut], frame.iloc[cut:]
+        self._chunks = [self._frame]
+        self._first_row = int(self._frame.index[0])
+
+        os.makedirs(self.spill_dir, exist_ok=True)
+        part = os.path.join(self.spill_dir, f"part-{self._spilled:05d}.npz")
+        columns = {}
+        for column in old.columns:
+            values = old[column].to_numpy()
+            columns[column] = values.astype(str) if values.dtype == object else values
+        np.savez(part, __row__=old.index.to_numpy(), **columns)
+        self._spilled += 1
+
+        for home, parts in self._homes.items():
+            self._homes[home] = [rows[rows.index >= self._first_row] for rows in parts]
+        self._home_frames = {}
+
+    def _collect(self):
+        if len(self._chunks) != 1 or self._frame is not self._chunks[0]:
+            columns = self._columns or []
+            self._frame = pd.concat(self._chunks) if self._chunks else pd.DataFrame(columns=columns)
+            self._chunks = [self._frame]
+        return self._frame
+
+    def _empty(self):
+        return pd.DataFrame(columns=self._columns or [])
+
+    def read(self):
+        """Returns the in-memory window, after parsing anything appended since the last call."""
+        with self._lock:
+            self._poll()
+            return self._empty() if self._missing else self._collect()
+
+    def home(self, home_id):
+        """Returns the in-memory rows for one home, maintained incrementally."""
+        with self._lock:
+            self._poll()
+            if self._missing:
+                return self._empty()
+            if home_id not in self._home_frames:
+                parts = self._homes.get(home_id, [])
+                self._home_frames[home_id] = pd.concat(parts) if parts else self._empty()
+                self._homes[home_id] = [self._home_frames[home_id]] if parts else []
+            return self._home_frames[home_id]
+
+    def history(self):
+        """Spilled rows plus the in-memory window, oldest first."""
+        frame = self.read()
+        if self._missing:
+            return frame
+        parts = []
+        for path in sorted(glob.glob(os.path.join(self.spill_dir, "part-*.npz"))):
+            with np.load(path) as part:
+                rows = pd.DataFrame({column: part[column] for column in part.files if column != "__row__"},
+                                    index=pd.Index(part["__row__"]))
+            parts.append(rows.astype(frame.dtypes.to_dict()))
+        return pd.concat(parts + [frame]) if parts else frame
+
+def get_reader(path, **kwargs):
+    """Shared reader for `path` in this process (options apply on first use)."""
+    with _readers_lock:
+        if path not in _readers:
+            _readers[path] = CsvTailReader(path, **kwargs)
+        return _readers[path]
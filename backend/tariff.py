@@ -0,0 +1,64 @@
+# --- backend/tariff.py ---
+
+import os
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+TARIFF_FILE = os.path.join(os.path.dirname(__file__), "tariffs.csv")
+DEFAULT_TARIFF = "bbmp"
+
+class SlabTariff:
+    """
+    Tiered tariff: units between lower[k] and lower[k + 1] are charged rates[k].
+    Bills are computed for whole arrays at once with np.searchsorted over the slab
+    boundaries plus the cumulative cost of every slab below.
+    """
+
+    def __init__(self, name, lower_kwh, rates):
+        self.name = name
+        self.lower = np.asarray(lower_kwh, dtype=np.float64)
+        self.rates = np.asarray(rates, dtype=np.float64)
+        if len(self.lower) == 0 or self.lower[0] != 0 or np.any(np.diff(self.lower) <= 0):
+            raise ValueError(f"Tariff {name!r} needs increasing slab boundaries starting at 0")
+        # Cost of consuming exactly up to each slab's lower boundary
+        self.base = np.concatenate([[0.0], np.cumsum(np.diff(self.lower) * self.rates[:-1])])
+
+    def bill(self, units):
+        """Bill for each consumption in `units`; a scalar in gives a float back."""
+        units_arr = np.asarray(units, dtype=np.float64)
+        slab = np.clip(np.searchsorted(self.lower, units_arr, side="right") - 1, 0, None)
+        bills = self.base[slab] + (units_arr - self.lower[slab]) * self.rates[slab]
+        return float(bills) if bills.ndim == 0 else bills
+
+    def slabs(self):
+        upper = np.append(self.lower[1:], np.inf)
+        return pd.DataFrame({"lower_kwh": self.lower, "upper_kwh": upper, "rate_per_kwh": self.rates})
+
+@lru_cache(maxsize=None)
+def _read_tariffs(path, mtime):
+    return pd.read_csv(path)
+
+def load_tariff(name=DEFAULT_TARIFF, path=TARIFF_FILE):
+    """Loads the slab definition `name` from the tariff table (re-read when the file changes)."""
+    table = _read_tariffs(path, os.path.getmtime(path))
+    rows = table[table["tariff"] == name].sort_values("lower_kwh")
+    if rows.empty:
+        raise KeyError(f"Tariff {name!r} not found in {path}")
+    return SlabTariff(name, rows["lower_kwh"].to_numpy(), rows["rate_per_kwh"].to_numpy())
+
+def bill_by_home(df, tariff=None, period="M", home_col="home_id", energy_col="energy_kwh", time_col="timestamp"):
+    """
+    Per-home bills for every billing period (a pandas period alias, e.g. "M" or "D")
+    straight from a usage DataFrame. Returns home_id, period, units_kwh and bill_rs.
+    """
+    tariff = tariff or load_tariff()
+    periods = pd.to_datetime(df[time_col]).dt.to_period(period)
+    usage = (
+        df.groupby([df[home_col], periods.rename("period")], observed=True)[energy_col]
+        .sum()
+        .rename("units_kwh")
+        .reset_index()
+    )
+    usage["bill_rs"] = tariff.bill(usage["units_kwh"].to_numpy())
+    return usage
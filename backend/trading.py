@@ -1,75 +1,143 @@
 # --- backend/trading.py ---
 
 import random
+import numpy as np
 import networkx as nx
 import json
+from backend.dijkstra_engine import build_csr, heap_dijkstra
+from backend.grid_graph import edge_arrays, power_weighted_costs, to_networkx
+from backend.routing_cache import RoutingCache
+from backend.standard_dijkstra import SmartGridGraph as _SmartGridGraph
 
-class SmartGridGraph:
-    def __init__(self, num_nodes, connection_density=0.5):
-        self.num_nodes = num_nodes
-        self.edges = {i: [] for i in range(num_nodes)}
-        self.graph = nx.Graph()
-        self.edge_list = []
-        self._generate_random_edges(connection_density)
-
-    def _generate_random_edges(self, density):
-        self.graph.add_nodes_from(range(self.num_nodes))
-        for i in range(self.num_nodes):
-            for j in range(i + 1, self.num_nodes):
-                if random.random() < density:
-                    weight = random.randint(1, 20)
-                    self.edges[i].append((j, weight))
-                    self.edges[j].append((i, weight))
-                    self.graph.add_edge(i, j, weight=weight)
-                    self.edge_list.append((i, j, weight))
-
-    def get_edge_list(self):
-        return self.edge_list
-
+class SmartGridGraph(_SmartGridGraph):
     def get_num_nodes(self):
         return self.num_nodes
 
 class PowerAwareGraph:
-    def __init__(self, num_nodes, edge_list, powers=None):
+    # Weight changes kept for incremental route repair; older history forces a full recompute
+    MAX_CHANGE_LOG = 100_000
+
+    def __init__(self, num_nodes, edge_list, powers=None, routing_method="dijkstra"):
         self.num_nodes = num_nodes
-        self.graph = nx.Graph()
         self.powers = powers or {i: round(random.uniform(0.5, 2.0), 2) for i in range(num_nodes)}
+        self.version = 0
+        self._graph = None
+        self._csr = None
+        self._csr_lists = None
+        self._change_log = []
+        self._log_start = 0
         self._use_edge_list(edge_list)
+        self.routes = RoutingCache(self, method=routing_method)
 
     def _use_edge_list(self, edge_list):
-        self.graph.add_nodes_from(range(self.num_nodes))
-        for u, v, base_cost in edge_list:
-            power_weighted_cost = round(base_cost / (self.powers[u] * self.powers[v]), 2)
-            self.graph.add_edge(u, v, weight=power_weighted_cost)
-
-    def dijkstra(self, source):
-        dist = {node: float('inf') for node in self.graph.nodes}
-        dist[source] = 0
-        prev = {node: None for node in self.graph.nodes}
-        visited = set()
-        steps = []
-
-        while len(visited) < len(self.graph.nodes):
-            u = min((node for node in self.graph.nodes if node not in visited), key=lambda x: dist[x], default=None)
-            if u is None:
+        self.u, self.v, self.base_costs = edge_arrays(edge_list)
+        self.base_costs = self.base_costs.astype(float)
+        self._power = np.array([self.powers[i] for i in range(self.num_nodes)], dtype=float)
+        self.weights = power_weighted_costs(self.u, self.v, self.base_costs, self._power)
+
+    def _build_csr(self):
+        indptr, indices, weights, self._edge_ids, self._slots = build_csr(
+            self.num_nodes, self.u, self.v, self.weights, return_edge_ids=True
+        )
+        self._csr = indptr, indices, weights
+        self._csr_lists = None
+
+    def _find_edge(self, u, v):
+        if self._csr is None:
+            self._build_csr()
+        indptr, indices, _ = self._csr
+        row = indices[indptr[u]:indptr[u + 1]]
+        k = np.searchsorted(row, v)
+        return int(self._edge_ids[indptr[u] + k]) if k < len(row) and row[k] == v else None
+
+    def _incident_edges(self, node):
+        if self._csr is None:
+            self._build_csr()
+        indptr = self._csr[0]
+        return self._edge_ids[indptr[node]:indptr[node + 1]]
+
+    def _reweight(self, edges, old=None):
+        """
+        Recomputes the power-aware weight of `edges` only, patches the CSR in place
+        and logs the changes for the routing cache.
+        """
+        old = self.weights[edges].copy() if old is None else old
+        self.weights[edges] = power_weighted_costs(self.u[edges], self.v[edges], self.base_costs[edges], self._power)
+        changed = self.weights[edges] != old
+        edges, old = edges[changed], old[changed]
+
+        self.version += 1
+        self._graph = None
+        if self._csr is not None and len(edges):
+            slots = self._slots[edges]
+            new = np.repeat(self.weights[edges], 2)
+            self._csr[2][slots.ravel()] = new
+            if self._csr_lists is not None:
+                for slot, w in zip(slots.ravel().tolist(), new.tolist()):
+                    self._csr_lists[2][slot] = w
+        self._change_log.extend(zip([self.version] * len(edges), edges.tolist(), old.tolist()))
+        if len(self._change_log) > self.MAX_CHANGE_LOG:
+            drop = len(self._change_log) // 2
+            self._log_start = self._change_log[drop - 1][0]
+            del self._change_log[:drop]
+
+    def update_power(self, node, value):
+        self.powers[node] = value
+        self._power[node] = value
+        self._reweight(self._incident_edges(node))
+
+    def update_edge(self, u, v, base_cost):
+        edge = self._find_edge(u, v)
+        if edge is not None:
+            self.base_costs[edge] = base_cost
+            self._reweight(np.array([edge]))
+            return
+        # New edge: the CSR structure changes, but cached trees can still be repaired
+        edge = len(self.u)
+        self.u = np.append(self.u, u)
+        self.v = np.append(self.v, v)
+        self.base_costs = np.append(self.base_costs, float(base_cost))
+        self.weights = np.append(self.weights, float('inf'))
+        self._csr = None
+        self._csr_lists = None
+        self._reweight(np.array([edge]), old=np.array([float('inf')]))
+
+    def changes_since(self, version):
+        """
+        Returns [(u, v, old_weight)] for edges changed after `version` (first old weight
+        per edge), or None if that history has been discarded.
+        """
+        if version < self._log_start:
+            return None
+        first_old = {}
+        for changed_version, edge, old in reversed(self._change_log):
+            if changed_version <= version:
                 break
-            visited.add(u)
-            steps.append((u, dict(dist)))
-            for v in self.graph.neighbors(u):
-                weight = self.graph[u][v]['weight']
-                if dist[u] + weight < dist[v]:
-                    dist[v] = dist[u] + weight
-                    prev[v] = u
-
-        paths = {node: self._reconstruct_path(prev, source, node) for node in self.graph.nodes}
-        return dist, paths, steps
-
-    def _reconstruct_path(self, prev, src, tgt):
-        path = []
-        while tgt is not None:
-            path.insert(0, tgt)
-            tgt = prev[tgt]
-        return path if path and path[0] == src else []
+            first_old[edge] = old
+        return [(int(self.u[e]), int(self.v[e]), old) for e, old in first_old.items()]
+
+    @property
+    def graph(self):
+        if self._graph is None:
+            self._graph = to_networkx(self.num_nodes, self.u, self.v, self.weights)
+        return self._graph
+
+    def get_edge_arrays(self):
+        return self.u, self.v, self.weights
+
+    def get_csr(self):
+        if self._csr is None:
+            self._build_csr()
+        return self._csr
+
+    def get_csr_lists(self):
+        # Plain-list copy of the CSR for the pure-Python heap loops, patched alongside the arrays
+        if self._csr_lists is None:
+            self._csr_lists = tuple(a.tolist() for a in self.get_csr())
+        return self._csr_lists
+
+    def dijkstra(self, source, trace=False):
+        return heap_dijkstra(*self.get_csr_lists(), source, trace=trace)
 
     def get_graph(self):
         return self.graph
@@ -89,7 +157,7 @@ def simulate_token_trading(power_graph, net_energy):
 
     for surplus_home in surplus_nodes:
         tokens_available = wallet[surplus_home]["tokens"]
-        path_costs, path_routes, _ = power_graph.dijkstra(surplus_home)
+        path_costs, path_routes = power_graph.routes.tree(surplus_home)
 
         sorted_deficits = sorted(deficit_nodes, key=lambda h: path_costs.get(h, float('inf')))
 
@@ -122,3 +190,68 @@ def simulate_token_trading(power_graph, net_energy):
             })
 
     return wallet, trades_log
+
+# Fixed-point scale for network simplex, which needs integer costs (weights have 2 decimals)
+COST_SCALE = 100
+
+def _decompose_flow(flow, source, sink):
+    # Peel source -> sink paths off an acyclic flow; yields (path, amount)
+    while True:
+        path = [source]
+        node = source
+        while node != sink:
+            node = next((v for v, f in flow[node].items() if f > 0), None)
+            if node is None:
+                return
+            path.append(node)
+        amount = min(flow[u][v] for u, v in zip(path, path[1:]))
+        for u, v in zip(path, path[1:]):
+            flow[u][v] -= amount
+        yield path[1:-1], amount
+
+def simulate_token_trading_optimal(power_graph, net_energy):
+    """
+    Clears all trades in one min-cost max-flow solve over the grid: surplus homes
+    supply their tokens, deficit homes demand theirs and every grid edge costs its
+    power-aware weight. Moves as many tokens as the greedy engine can reach, at the
+    globally cheapest total route cost. Returns (wallet, trades_log) like
+    simulate_token_trading.
+    """
+    wallet = {home: {"tokens": max(0, int(balance))} for home, balance in net_energy.items()}
+    u, v, w = power_graph.get_edge_arrays()
+    u, v, w = u.tolist(), v.tolist(), w.tolist()
+    weight = {**dict(zip(zip(u, v), w)), **dict(zip(zip(v, u), w))}
+    source, sink = "_source", "_sink"
+
+    flow_graph = nx.DiGraph()
+    flow_graph.add_weighted_edges_from(
+        ((a, b, int(round(c * COST_SCALE))) for (a, b), c in weight.items()), weight="weight"
+    )
+    for home, balance in net_energy.items():
+        if balance > 0 and int(balance) > 0:
+            flow_graph.add_edge(source, home, capacity=int(balance), weight=0)
+        elif balance < 0 and int(abs(balance)) > 0:
+            flow_graph.add_edge(home, sink, capacity=int(abs(balance)), weight=0)
+    if source not in flow_graph or sink not in flow_graph:
+        return wallet, []
+
+    flow = nx.max_flow_min_cost(flow_graph, source, sink)
+    trades = {}
+    for route, amount in _decompose_flow(flow, source, sink):
+        key = (route[0], route[-1])
+        if key in trades:
+            trades[key]["tokens"] += amount
+        else:
+            path_cost = 0
+            for a, b in zip(route, route[1:]):
+                path_cost += weight[(a, b)]
+            trades[key] = {"from": route[0], "to": route[-1], "tokens": amount,
+                           "path_cost": path_cost, "path_route": route}
+
+    trades_log = sorted(trades.values(), key=lambda t: (t["from"], t["path_cost"]))
+    for trade in trades_log:
+        wallet[trade["from"]]["tokens"] -= trade["tokens"]
+        wallet[trade["to"]]["tokens"] += trade["tokens"]
+        net_energy[trade["from"]] -= trade["tokens"]
+        net_energy[trade["to"]] += trade["tokens"]
+    return wallet, trades_log
@@ -2,10 +2,11 @@
 
 import streamlit as st
 from utils.auth import check_session, logout
-import pandas as pd
-import random
 import numpy as np
 import tenseal as ts
+from backend.encryption import get_ckks_context
+from backend.billing_utils import compute_bbmp_bill
+from backend.encrypted_store import EncryptedStore, STORE_DIR
 
 check_session()
 st.set_page_config(page_title="Smart Energy Dashboard", layout="wide")
@@ -25,21 +26,45 @@ if st.session_state.role == "admin":
         </p>
     """, unsafe_allow_html=True)
 
+    @st.cache_data(ttl=60)
+    def encrypted_usage_today():
+        # Readings stored as packed CKKS vectors are summed homomorphically; only the totals are decrypted
+        store = EncryptedStore(STORE_DIR)
+        index = store.index()
+        if not len(index):
+            return None
+        day = np.datetime64(int(index["t_max"].max()), "ns").astype("datetime64[D]")
+        start, end = day, day + np.timedelta64(1, "D") - np.timedelta64(1, "ns")
+        sums = store.encrypted_sums_by_home(start, end)
+        per_home = sorted((home, round(vec.decrypt()[0], 2)) for home, vec in sums.items())
+        total = None
+        for vec in sums.values():
+            total = vec if total is None else total + vec
+        records = store.records(start=start, end=end)["record"].nunique()
+        return (total.decrypt()[0] if total is not None else 0.0,
+                {"Home ID": [h for h, _ in per_home], "Usage (kWh)": [u for _, u in per_home]}, str(day), records)
+
+    usage_today = encrypted_usage_today()
+    if usage_today is None:
+        total_today, per_home, day, records = 0.0, {"Home ID": [], "Usage (kWh)": []}, None, 0
+    else:
+        total_today, per_home, day, records = usage_today
+
     col1, col2 = st.columns(2)
     with col1:
-        st.metric("🏠 Total Homes", 3)
+        st.metric("🏠 Total Homes", len(per_home["Home ID"]))
     with col2:
-        st.metric("⚡ Total Usage Today", "52.9 kWh")
+        st.metric("⚡ Total Usage Today", f"{total_today:.1f} kWh")
 
     st.markdown("</div>", unsafe_allow_html=True)
 
     with st.expander("📋 Per-Home Usage Details"):
-        dummy_data = {
-            "Home ID": [f"home_{i:03d}" for i in range(1, 11)],
-            "Usage (kWh)": [round(random.uniform(10, 50), 2) for _ in range(10)]
-        }
-        df = pd.DataFrame(dummy_data)
-        st.dataframe(df, use_container_width=True)
+        if usage_today is None:
+            st.info("The encrypted store is empty. Fill it with `python -m backend.streaming --replay "
+                    f"--store {STORE_DIR}`.")
+        else:
+            st.dataframe(per_home, use_container_width=True)
+            st.caption(f"Summed homomorphically over {records} encrypted records for {day}")
 
 st.divider()
 
@@ -51,19 +76,6 @@ st.markdown("""
 Secure billing using encrypted energy data and privacy-preserving techniques like Differential Privacy.
 """)
 
-# BBMP tiered billing function
-def compute_bbmp_bill(units):
-    total = 0
-    if units <= 50:
-        total += units * 4.15
-    elif units <= 100:
-        total += 50 * 4.15 + (units - 50) * 5.60
-    elif units <= 200:
-        total += 50 * 4.15 + 50 * 5.60 + (units - 100) * 7.15
-    else:
-        total += 50 * 4.15 + 50 * 5.60 + 100 * 7.15 + (units - 200) * 8.20
-    return total
-
 # Initialize session state
 if "step" not in st.session_state:
     st.session_state.step = 0
@@ -88,10 +100,8 @@ if noise_col3.button("High"):
 
 st.info(f"Current Noise Level: `{st.session_state.noise_level}`")
 
-# CKKS context setup
-context = ts.context(ts.SCHEME_TYPE.CKKS, poly_modulus_degree=8192, coeff_mod_bit_sizes=[60, 40, 40, 60])
-context.generate_galois_keys()
-context.global_scale = 2 ** 40
+# CKKS context setup (shared per process, no rotations needed here)
+context = get_ckks_context(galois_keys=False)
 
 # Step-by-step simulation
 if st.session_state.step >= 0:
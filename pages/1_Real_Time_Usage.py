@@ -3,7 +3,7 @@ import pandas as pd
 import plotly.express as px
 from backend.auth import check_session, logout
 from backend.data_handler import load_decrypted_usage
-from backend.privacy import add_laplace_noise
+from backend.privacy import PrivacyLedger, PrivacyBudgetExceeded
 import time
 
 check_session()
@@ -12,8 +12,12 @@ st.title("📊 Real-Time Usage with Differential Privacy")
 
 st.sidebar.button("🚪 Logout", on_click=logout)
 
-# 🔐 Slider for epsilon
-epsilon = st.slider("Privacy Level (ε):", min_value=0.1, max_value=5.0, step=0.1, value=1.0)
+mechanism = st.radio("Mechanism", ["Laplace", "Gaussian (δ = 1e-5)"], horizontal=True)
+gaussian = mechanism != "Laplace"
+
+# 🔐 Slider for epsilon (the Gaussian calibration only holds for ε < 1)
+max_epsilon = 0.9 if gaussian else 5.0
+epsilon = st.slider("Privacy Level (ε):", min_value=0.1, max_value=max_epsilon, step=0.1, value=min(1.0, max_epsilon))
 privacy_level = (
     "🔴 High Privacy" if epsilon < 0.5 else
     "🟡 Medium Privacy" if epsilon < 2.0 else
@@ -21,12 +25,19 @@ privacy_level = (
 )
 st.caption(f"Selected ε = {epsilon:.1f} ({privacy_level})")
 
+# Per-home ε budget shared across reruns and sessions; each hour of readings is charged once per ε
+PRIVACY_BUDGET = 100.0
+RELEASE_WINDOW = "1h"
+
+@st.cache_resource
+def get_ledger():
+    return PrivacyLedger(budget=PRIVACY_BUDGET)
+
+ledger = get_ledger()
+
 # Load data
 df = load_decrypted_usage()
 
-# Add Laplace noise live
-df["noisy_kwh"] = df["energy_kwh"].apply(lambda x: add_laplace_noise(x, epsilon))
-
 # Filter
 if st.session_state.role == "home":
     home_id = st.session_state.home_id
@@ -35,9 +46,33 @@ else:
     home_filter = st.selectbox("Select Home", ["All"] + sorted(df["home_id"].unique()))
     filtered = df if home_filter == "All" else df[df["home_id"] == home_filter]
 
+# Add noise only to the rows on screen; rows from hours already released at this ε cost nothing
+filtered = filtered.tail(100).copy()
+shown_homes = sorted(filtered["home_id"].unique())
+try:
+    filtered["noisy_kwh"] = ledger.release(filtered, epsilon, mechanism="gaussian" if gaussian else "laplace",
+                                           window=RELEASE_WINDOW)
+except PrivacyBudgetExceeded as e:
+    st.error(f"🔒 Privacy budget exhausted: {e}")
+    st.markdown(
+        f"Each hour of readings shown for the first time at a given ε costs that ε for its home, up to "
+        f"{PRIVACY_BUDGET:.0f} per home. Remaining: "
+        + ", ".join(f"{home} {max(ledger.remaining(home), 0.0):.1f}" for home in shown_homes)
+        + ". Pick an ε you have already used (released hours are free to view again) or a smaller one "
+        "that fits, or ask an admin to reset the budget."
+    )
+    if st.session_state.role == "admin" and st.button("♻️ Reset privacy budget for these homes"):
+        for home in shown_homes:
+            ledger.reset(home)
+        st.rerun()
+    st.stop()
+
+st.caption("ε spent: " + ", ".join(f"{home} {ledger.spent.get(home, 0.0):.1f}/{PRIVACY_BUDGET:.0f}"
+                                   for home in shown_homes))
+
 # Plot
 fig = px.line(
-    filtered.tail(100),
+    filtered,
     x="timestamp",
     y="noisy_kwh",
     color="home_id" if st.session_state.role == "admin" and home_filter == "All" else None,
@@ -1,7 +1,8 @@
 import streamlit as st
 from utils.auth import check_session, logout
-import pandas as pd
 import plotly.graph_objects as go
+from backend import api_client
+from backend.tail_reader import get_reader
 
 check_session()
 st.set_page_config(page_title="Anomaly Detection", layout="wide")
@@ -9,10 +10,12 @@ st.title("🚨 Anomaly Detection Dashboard")
 st.sidebar.button("🚪 Logout", on_click=logout)
 
 def load_anomaly_data():
-    df = pd.read_csv("decrypted/anomaly_results.csv")
-    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    if api_client.API_URL:
+        df = api_client.fetch_readings(st.session_state.home_id if st.session_state.role == "home" else None)
+    else:
+        # Shared incremental reader: reruns only parse rows streamed since the last one
+        df = get_reader("decrypted/anomaly_results.csv", dtypes={"home_id": str}).read().copy()
     df["is_anomaly_ml"] = df["is_anomaly_ml"].astype(bool)
-    df["home_id"] = df["home_id"].astype(str)
     return df
 
 df = load_anomaly_data()
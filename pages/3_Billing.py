@@ -8,6 +8,8 @@ import streamlit as st
 import numpy as np
 import tenseal as ts
 from backend.main_module import load_lstm_model, get_ckks_context, run_encrypted_inference, load_and_preprocess, create_lstm_sequences
+from backend.billing_utils import compute_bbmp_bill, compute_bbmp_bill_encrypted
+from backend.encrypted_billing import billing_context, slab_polynomial
 
 st.set_page_config(page_title="Encrypted Billing", layout="wide")
 st.title("💰 Smart Billing Module (CKKS + Forecasting)")
@@ -15,35 +17,35 @@ st.title("💰 Smart Billing Module (CKKS + Forecasting)")
 # Load trained LSTM model and scaler
 model = load_lstm_model("models/nig.h5")
 data_scaled, scaler = load_and_preprocess("data/household_power_consumption.txt")
-X, y = create_lstm_sequences(data_scaled)
 context = get_ckks_context()
 
-# Get the most recent prediction from forecasting module
-X_input = X[-1:]
-y_input = y[-1:]
+# Get the most recent prediction from forecasting module (only the last window is built)
+X_input, y_input = create_lstm_sequences(data_scaled, tail=1)
 _, forecasted_vals = run_encrypted_inference(model, X_input, y_input, scaler, context, max_samples=1)
 predicted_kwh = forecasted_vals[0]
 
 st.metric("🔮 Forecasted Usage (kWh)", f"{predicted_kwh:.2f}")
 
-# BBMP/BESCOM tiered billing function
-def compute_bbmp_bill(units):
-    total = 0
-    if units <= 50:
-        total += units * 4.15
-    elif units <= 100:
-        total += 50 * 4.15 + (units - 50) * 5.60
-    elif units <= 200:
-        total += 50 * 4.15 + 50 * 5.60 + (units - 100) * 7.15
-    else:
-        total += 50 * 4.15 + 50 * 5.60 + 100 * 7.15 + (units - 200) * 8.20
-    return total
-
 # Step 1: Compute raw bill
 bill_amount = compute_bbmp_bill(predicted_kwh)
 st.subheader("🧮 Step 1: Compute Bill")
 st.metric("💵 Raw Bill (Unencrypted)", f"₹{bill_amount:.2f}")
 
+with st.expander("🧪 Bill Computed on Ciphertext"):
+    billing_ctx = billing_context()
+    approximation = slab_polynomial()
+    billed_kwh = float(np.clip(predicted_kwh, 0.0, approximation.max_units))
+    if not approximation.covers(predicted_kwh):
+        # The polynomial diverges outside its fitted range, so clamp before encrypting
+        st.warning(f"Forecast of {predicted_kwh:.2f} kWh is outside the fitted 0-{approximation.max_units:.0f} kWh "
+                   f"range; billing {billed_kwh:.0f} kWh on the ciphertext instead.")
+    enc_usage = ts.ckks_vector(billing_ctx, [billed_kwh])
+    enc_bill = compute_bbmp_bill_encrypted([enc_usage])[0]
+    homomorphic_bill = enc_bill.decrypt()[0]
+    st.metric("🔐 Homomorphic Bill (decrypted)", f"₹{homomorphic_bill:.2f}", delta=f"{homomorphic_bill - bill_amount:+.2f} vs plaintext")
+    st.caption("The slab tariff is evaluated as a polynomial on the encrypted usage; the server never sees kWh or ₹ in plaintext. "
+               f"Approximation error is at most ₹{approximation.max_error:.2f} within the fitted range.")
+
 # Step 2: Encrypt bill using CKKS
 st.subheader("🔐 Step 2: Encrypt Bill")
 enc_vector = ts.ckks_vector(context, [bill_amount])
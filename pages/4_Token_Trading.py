@@ -9,7 +9,7 @@ import random
 import pandas as pd
 import json
 
-from backend.trading import simulate_token_trading, PowerAwareGraph, SmartGridGraph
+from backend.trading import simulate_token_trading, simulate_token_trading_optimal, PowerAwareGraph, SmartGridGraph
 
 def plot_graph(graph, net_energy, powers, highlight_path=None):
     pos = nx.spring_layout(graph, seed=42)
@@ -44,21 +44,30 @@ st.sidebar.header("📊 Graph Config")
 num_nodes = st.sidebar.slider("Nodes", 5, 20, 6)
 connection_density = st.sidebar.slider("Density", 0.1, 1.0, 0.5)
 seed = st.sidebar.number_input("Random seed", value=42, step=1)
-random.seed(seed)
 
-grid = SmartGridGraph(num_nodes=num_nodes, connection_density=connection_density)
-edge_list = grid.get_edge_list()
-powers = {i: round(random.uniform(0.5, 2.0), 2) for i in range(num_nodes)}
-power_graph = PowerAwareGraph(num_nodes, edge_list, powers)
+# Reuse the graph (and its routing cache) across reruns that only change net energy
+@st.cache_resource(max_entries=8)
+def build_power_graph(num_nodes, connection_density, seed):
+    random.seed(seed)
+    grid = SmartGridGraph(num_nodes=num_nodes, connection_density=connection_density)
+    edge_list = grid.get_edge_arrays()
+    powers = {i: round(random.uniform(0.5, 2.0), 2) for i in range(num_nodes)}
+    power_graph = PowerAwareGraph(num_nodes, edge_list, powers)
+    default_net = {i: round(random.uniform(-5, 5), 1) for i in range(num_nodes)}
+    return power_graph, default_net
+
+power_graph, default_net = build_power_graph(num_nodes, connection_density, seed)
+powers = power_graph.get_powers()
 graph = power_graph.get_graph()
 
-default_net = {i: round(random.uniform(-5, 5), 1) for i in range(num_nodes)}
 net_energy = {i: st.sidebar.number_input(f"Node {i}", value=default_net[i], step=0.1) for i in range(num_nodes)}
 
 st.markdown("### 🧠 Grid Visualization")
 plot_graph(graph, net_energy, powers)
 
-wallet, trades_log = simulate_token_trading(power_graph, net_energy.copy())
+engine = st.sidebar.radio("Clearing Engine", ["Greedy", "Min-Cost Flow"])
+clear_trades = simulate_token_trading_optimal if engine == "Min-Cost Flow" else simulate_token_trading
+wallet, trades_log = clear_trades(power_graph, net_energy.copy())
 
 st.markdown("### 💸 Final Wallet Balances")
 st.table({k: v['tokens'] for k, v in wallet.items()})
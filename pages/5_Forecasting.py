@@ -7,7 +7,7 @@ import numpy as np
 
 from backend.main_module import (
     load_and_preprocess, create_lstm_sequences, load_lstm_model,
-    get_ckks_context, run_encrypted_inference, evaluate_predictions
+    get_ckks_context, iter_encrypted_inference, evaluate_predictions
 )
 
 st.set_page_config(page_title="📈 Forecasting Module", layout="wide")
@@ -16,19 +16,24 @@ st.title("🔮 Forecasting with CKKS Encrypted LSTM")
 # Load everything
 model_path = "models/nig.h5"
 data_path = "data/household_power_consumption.txt"
+CHUNK_SIZE = 100  # points per batched inference call / chart refresh
+WINDOW_SIZE = 5
+MAX_FORECAST = 2000
 
 with st.spinner("Loading model and preparing data..."):
     data_scaled, scaler = load_and_preprocess(data_path)
-    X, y = create_lstm_sequences(data_scaled)
     model = load_lstm_model(model_path)
     context = get_ckks_context()
 
-# Only forecast future (test) portion
-train_size = min(4000, int(len(X) * 0.8))
-X_test, y_test = X[train_size:], y[train_size:]
+# Only forecast future (test) portion; build just the windows the slider can reach
+num_sequences = len(data_scaled) - WINDOW_SIZE
+train_size = min(4000, int(num_sequences * 0.8))
+X_test, y_test = create_lstm_sequences(
+    data_scaled, window_size=WINDOW_SIZE, start=train_size, stop=train_size + MAX_FORECAST
+)
 
 # User input
-max_samples = min(2000, len(X_test))
+max_samples = min(MAX_FORECAST, len(X_test))
 num_samples = st.slider("🔢 How many future points to simulate?", 10, max_samples, 100)
 
 if st.button("▶️ Run Forecast"):
@@ -36,12 +41,13 @@ if st.button("▶️ Run Forecast"):
     placeholder_chart = st.empty()
     progress = st.progress(0)
 
-    for i in range(num_samples):
-        actual, pred = run_encrypted_inference(
-            model, X_test[i:i+1], y_test[i:i+1], scaler, context, max_samples=1
-        )
-        actuals.append(actual[0])
-        preds.append(pred[0])
+    # Batched CKKS + LSTM inference, redrawn once per chunk
+    chunks = iter_encrypted_inference(
+        model, X_test[:num_samples], y_test[:num_samples], scaler, context, chunk_size=CHUNK_SIZE
+    )
+    for actual, pred in chunks:
+        actuals.extend(actual)
+        preds.extend(pred)
 
         fig, ax = plt.subplots()
         ax.plot(actuals, label="Actual", color="green")
@@ -52,7 +58,8 @@ if st.button("▶️ Run Forecast"):
         ax.grid(True)
         ax.legend()
         placeholder_chart.pyplot(fig)
-        progress.progress((i + 1) / num_samples)
+        plt.close(fig)
+        progress.progress(len(preds) / num_samples)
 
     st.success("✅ Forecasting completed.")
     metrics = evaluate_predictions(np.array(actuals), np.array(preds))
@@ -20,13 +20,13 @@ highlight_path = st.sidebar.checkbox("🔦 Highlight Shortest Path", value=True)
 # Initialize Session State
 if "std_graph" not in st.session_state:
     st.session_state.std_graph = SmartGridGraph(num_nodes, density)
-    edge_list = st.session_state.std_graph.get_edge_list()
+    edge_list = st.session_state.std_graph.get_edge_arrays()
     st.session_state.pow_graph = PowerAwareGraph(num_nodes, edge_list)
     st.session_state.fixed_pos = nx.spring_layout(st.session_state.std_graph.get_graph(), seed=42)
 
 def regenerate_graphs():
     st.session_state.std_graph = SmartGridGraph(num_nodes, density)
-    edge_list = st.session_state.std_graph.get_edge_list()
+    edge_list = st.session_state.std_graph.get_edge_arrays()
     st.session_state.pow_graph = PowerAwareGraph(num_nodes, edge_list)
     st.session_state.fixed_pos = nx.spring_layout(st.session_state.std_graph.get_graph(), seed=42)
 
@@ -35,7 +35,7 @@ if st.sidebar.button("🔁 Regenerate Graphs"):
 
 def run_dijkstra(graph_obj, source):
     start = time.time()
-    dist, paths, steps = graph_obj.dijkstra(source)
+    dist, paths, steps = graph_obj.dijkstra(source, trace=True)
     end = time.time()
     return dist, paths, steps, graph_obj.get_graph(), round(end - start, 6)
 
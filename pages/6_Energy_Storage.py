@@ -1,15 +1,17 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-from backend.storage_optimizer import optimize_battery_operation
+from backend.data_handler import load_decrypted_usage
+from backend.storage_optimizer import (
+    optimize_battery_operation, optimize_battery_schedule, format_actions, sweep_battery_configurations,
+    time_of_use_prices
+)
 
 st.set_page_config(page_title="🔋 Energy Storage Optimizer", layout="wide")
 st.title("🔋 Smart Battery Optimization")
 
 # Load dataset
 try:
-    df = pd.read_csv("decrypted/decrypted_usage.csv")
-    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    df = load_decrypted_usage()
     df["energy_kwh"] = df["energy_kwh"].astype(float)
 except Exception as e:
     st.error(f"Failed to load data: {e}")
@@ -22,12 +24,17 @@ charge_rate = st.sidebar.slider("Charge Rate (kWh)", 1, 5, 2)
 discharge_rate = st.sidebar.slider("Discharge Rate (kWh)", 1, 5, 2)
 price_per_kwh = st.sidebar.slider("Price per kWh (₹)", 4.0, 10.0, 6.0)
 
-optimized = optimize_battery_operation(
+scheduler = st.sidebar.radio("Scheduler", ["Greedy Rule", "Optimal (Time-of-Use)"])
+
+# Both schedulers are priced on the same time-of-use tariff, so their savings compare directly
+optimize = optimize_battery_operation if scheduler == "Greedy Rule" else optimize_battery_schedule
+optimized = optimize(
     df,
     capacity_kwh=battery_capacity,
     charge_rate=charge_rate,
     discharge_rate=discharge_rate,
-    price_per_kwh=price_per_kwh
+    price_per_kwh=price_per_kwh,
+    prices=time_of_use_prices(df["timestamp"], price_per_kwh)
 )
 
 # Show chart
@@ -43,7 +50,29 @@ st.plotly_chart(fig, use_container_width=True)
 
 # Show actions
 st.subheader("⚡ Battery Actions Log")
-st.dataframe(optimized[["timestamp", "action", "soc_kwh", "savings_rs"]].tail(30))
+actions_log = optimized[["timestamp", "action", "action_kwh", "soc_kwh", "savings_rs"]].tail(30).copy()
+actions_log["action"] = format_actions(actions_log)
+st.dataframe(actions_log[["timestamp", "action", "soc_kwh", "savings_rs"]])
 
 total_savings = optimized["savings_rs"].sum()
-st.success(f"✅ Estimated Total Savings: ₹{total_savings:.2f}")
+st.success(f"✅ Estimated Total Savings: ₹{total_savings:.2f} (grid bill avoided at time-of-use prices)")
+
+
+# Battery sizing sweep (greedy rule, flat price): every capacity × charge rate on the sidebar ranges, current discharge rate
+st.subheader("📐 Battery Sizing Sweep")
+sweep = sweep_battery_configurations(
+    df,
+    capacities=range(5, 21),
+    charge_rates=range(1, 6),
+    discharge_rates=[discharge_rate],
+    prices=[price_per_kwh]
+)
+surface = sweep.pivot(index="capacity_kwh", columns="charge_rate", values="total_savings_rs")
+fig_sweep = px.imshow(
+    surface,
+    labels={"x": "Charge Rate (kWh)", "y": "Battery Capacity (kWh)", "color": "Savings (₹)"},
+    aspect="auto",
+    origin="lower",
+    title="Estimated Savings by Battery Size"
+)
+st.plotly_chart(fig_sweep, use_container_width=True)
@@ -0,0 +1,59 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from backend.api import ReadingService, app, get_service
+from backend.ingestion import train_synthetic_model
+
+@pytest.fixture(scope="module")
+def model():
+    return train_synthetic_model(samples=2000)
+
+@pytest.fixture
+def service(model):
+    return ReadingService(model=model, max_homes=3, detector_snapshot=None)
+
+@pytest.fixture
+def client(service):
+    app.dependency_overrides[get_service] = lambda: service
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+def batch(*rows):
+    return {"readings": [{"home_id": h, "timestamp": t, "energy_kwh": v} for h, t, v in rows]}
+
+def test_mixed_iso_formats_in_one_batch(client):
+    response = client.post("/readings", json=batch(
+        ("h1", "2025-01-01T00:00:00", 0.1), ("h1", "2025-01-01 00:01", 0.2), ("h1", "2025-01-01T00:02:00.500", 0.3),
+    ))
+    assert response.status_code == 200 and response.json()["accepted"] == 3
+
+def test_mixed_utc_offsets_are_normalised_to_utc(client):
+    response = client.post("/readings", json=batch(
+        ("h1", "2025-01-01T05:30:00+05:30", 0.1), ("h1", "2025-01-01T00:01:00Z", 0.2),
+    ))
+    assert response.status_code == 200
+    readings = client.get("/homes/h1/readings", params={"end": "2025-01-01T00:00:30"}).json()
+    assert [r["energy_kwh"] for r in readings] == [0.1]
+
+def test_unparseable_timestamp_is_rejected(client, service):
+    response = client.post("/readings", json=batch(("h1", "2025-01-01T00:00:00", 0.1), ("h2", "yesterday", 0.2)))
+    assert response.status_code == 422
+    assert not service.homes and not service.detector.memory_usage()["homes"]
+
+def test_bad_ndjson_timestamp_is_rejected(client):
+    body = "\n".join(json.dumps({"home_id": "h1", "timestamp": t, "energy_kwh": 0.1}) for t in ["2025-01-01", "nope"])
+    assert client.post("/readings/ndjson", content=body).status_code == 400
+
+def test_bad_query_bounds_are_rejected(client):
+    client.post("/readings", json=batch(("h1", "2025-01-01T00:00:00", 0.1)))
+    assert client.get("/homes/h1/readings", params={"start": "bad"}).status_code == 400
+    assert client.get("/readings", params={"end": "bad"}).status_code == 400
+
+def test_batch_over_max_homes_leaves_state_untouched(client, service):
+    client.post("/readings", json=batch(("h1", "2025-01-01T00:00:00", 0.1)))
+    rows = [(f"h{i}", "2025-01-01T00:01:00", 0.1) for i in range(4)]
+    assert client.post("/readings", json=batch(*rows)).status_code == 422
+    assert list(service.homes) == ["h1"]
+    assert service.detector.memory_usage()["homes"] == 1
+    # The detector still accepts a valid batch afterwards
+    assert client.post("/readings", json=batch(*rows[:3])).status_code == 200
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backend.encryption import get_ckks_context
+from backend.encrypted_aggregation import EncryptedAggregator, aggregate_usage
+
+@pytest.fixture(scope="module")
+def context():
+    return get_ckks_context(cache_dir=None)
+
+def usage(homes, readings, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "timestamp": pd.date_range("2025-01-01 12:00", periods=readings, freq="5s"),
+        "home_id": np.array([f"home_{i:04d}" for i in range(homes)])[rng.integers(0, homes, readings)],
+        "energy_kwh": rng.uniform(0, 0.05, readings),
+    })
+
+@pytest.mark.parametrize("homes", [3, 2000])
+def test_totals_match_plaintext(context, homes):
+    df = usage(homes, 20000)
+    aggregator = aggregate_usage(df, context)
+    expected = df.groupby("home_id")["energy_kwh"].sum()
+    assert aggregator.totals_by_home().reindex(expected.index).to_numpy() == pytest.approx(expected.to_numpy(), abs=1e-3)
+    by_day = df.groupby(df["timestamp"].dt.to_period("D"))["energy_kwh"].sum()
+    assert aggregator.totals_by_bucket().to_numpy() == pytest.approx(by_day.to_numpy(), abs=1e-3)
+    assert aggregator.total() == pytest.approx(df["energy_kwh"].sum(), abs=1e-3)
+    assert aggregator.counts_by_home == df["home_id"].value_counts().to_dict()
+
+def test_batch_cost_does_not_grow_with_homes(context):
+    # 4096 readings over 2000 homes: a couple of ciphertexts, each added once per lane and bucket
+    aggregator = EncryptedAggregator(context)
+    df = usage(2000, 4096)
+    vectors, layout = aggregator.pack(df["energy_kwh"].to_numpy(), df["home_id"].to_numpy(), df["timestamp"].to_numpy())
+    assert len(vectors) <= 2 * layout.groupby("home_id").size().max()
+    aggregator.add_batch(vectors, layout)
+    assert len(aggregator._by_lane) == 1 and len(aggregator._by_bucket) == 1
+    assert aggregator.readings_per_sec > 100_000
@@ -0,0 +1,27 @@
+import numpy as np
+from backend.encrypted_billing import MAX_ERROR_RS, MAX_UNITS, billing_context, slab_polynomial
+from backend.encryption import decrypt_values, encrypt_values
+from backend.tariff import load_tariff
+
+def test_default_fit_error_is_bounded():
+    approximation = slab_polynomial()
+    units = np.linspace(0.0, MAX_UNITS, 40001)
+    bills = load_tariff().bill(units)
+    error = np.abs(approximation.evaluate_plain(units) - bills)
+    assert approximation.max_error <= MAX_ERROR_RS
+    assert error.max() <= MAX_ERROR_RS
+    # Roughly relative above the first slab: small bills are not swamped by the kink error
+    above = units >= 10
+    assert (error[above] / bills[above]).max() <= 0.03
+    assert error[units < 10].max() <= 0.5
+
+def test_covers_flags_usage_outside_the_fit():
+    approximation = slab_polynomial()
+    assert approximation.covers([0.0, MAX_UNITS]).all()
+    assert not approximation.covers([-1.0, MAX_UNITS + 1]).any()
+
+def test_encrypted_bills_stay_within_bound():
+    context = billing_context()
+    units = np.random.default_rng(0).uniform(0, MAX_UNITS, 1000)
+    bills = decrypt_values(context, slab_polynomial().evaluate(encrypt_values(context, units)))
+    assert np.abs(bills - load_tariff().bill(units)).max() <= MAX_ERROR_RS + 0.1
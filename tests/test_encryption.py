@@ -0,0 +1,42 @@
+import multiprocessing
+import numpy as np
+import tenseal as ts
+from backend.encryption import _context_path, get_ckks_context
+
+PARAMS = (8192, (60, 40, 40, 60), 2**40)
+
+def _encrypt_in_fresh_process(cache_dir, galois_keys, start, results):
+    start.wait()
+    context = get_ckks_context(*PARAMS, galois_keys=galois_keys, cache_dir=cache_dir)
+    results.put((ts.ckks_vector(context, [1.5]).serialize(), context.has_galois_keys()))
+
+def _race(cache_dir, galois_keys, processes=4):
+    ctx = multiprocessing.get_context("spawn")
+    start, results = ctx.Event(), ctx.Queue()
+    workers = [ctx.Process(target=_encrypt_in_fresh_process, args=(cache_dir, galois_keys, start, results))
+               for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    start.set()
+    out = [results.get(timeout=120) for _ in workers]
+    for worker in workers:
+        worker.join()
+    return out
+
+def _cached(cache_dir):
+    with open(_context_path(str(cache_dir), *PARAMS), "rb") as f:
+        return ts.context_from(f.read())
+
+def test_processes_racing_on_an_empty_cache_share_one_key(tmp_path):
+    results = _race(str(tmp_path), galois_keys=False)
+    cached = _cached(tmp_path)
+    for data, _ in results:
+        assert np.isclose(ts.ckks_vector_from(cached, data).decrypt()[0], 1.5, atol=1e-4)
+
+def test_galois_upgrade_keeps_the_cached_key(tmp_path):
+    _race(str(tmp_path), galois_keys=False, processes=1)
+    results = _race(str(tmp_path), galois_keys=True, processes=3)
+    cached = _cached(tmp_path)
+    assert cached.has_galois_keys() and all(galois for _, galois in results)
+    for data, _ in results:
+        assert np.isclose(ts.ckks_vector_from(cached, data).sum().decrypt()[0], 1.5, atol=1e-3)
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backend.privacy import PrivacyBudgetExceeded, PrivacyLedger
+
+def readings(hours=3, homes=("h1", "h2")):
+    timestamps = pd.date_range("2025-01-01", periods=hours * 60, freq="min")
+    return pd.DataFrame({
+        "timestamp": np.tile(timestamps, len(homes)),
+        "home_id": np.repeat(homes, len(timestamps)),
+        "energy_kwh": np.random.default_rng(0).uniform(0, 0.05, len(timestamps) * len(homes)),
+    })
+
+def test_release_is_repeatable_and_free_on_rerun(tmp_path):
+    ledger = PrivacyLedger(tmp_path / "ledger.json")
+    df = readings()
+    first = ledger.release(df, epsilon=0.5)
+    assert ledger.spent == {"h1": 1.5, "h2": 1.5}
+    assert np.array_equal(ledger.release(df.sample(frac=1, random_state=1).sort_index(), epsilon=0.5), first)
+    assert ledger.spent == {"h1": 1.5, "h2": 1.5}
+    # A reloaded ledger reproduces the same noise
+    assert np.array_equal(PrivacyLedger(tmp_path / "ledger.json").release(df, epsilon=0.5), first)
+
+def test_row_keeps_its_noise_as_its_window_fills(tmp_path):
+    ledger = PrivacyLedger(tmp_path / "ledger.json")
+    df = readings()
+    partial = ledger.release(df.iloc[:90], epsilon=0.5)
+    assert np.array_equal(ledger.release(df, epsilon=0.5)[:90], partial)
+
+def test_independent_noise_per_row_and_parameters(tmp_path):
+    ledger = PrivacyLedger(tmp_path / "ledger.json")
+    df = readings()
+    noise = ledger.release(df, epsilon=0.5) - df["energy_kwh"].to_numpy()
+    assert len(np.unique(noise)) == len(df)
+    assert not np.allclose(ledger.release(df, epsilon=0.8) - df["energy_kwh"].to_numpy(), noise)
+    gaussian = ledger.release(df, epsilon=0.5, mechanism="gaussian") - df["energy_kwh"].to_numpy()
+    assert not np.allclose(gaussian, noise)
+
+def test_budget_is_enforced_per_window(tmp_path):
+    ledger = PrivacyLedger(tmp_path / "ledger.json", budget=1.0)
+    df = readings()
+    ledger.release(df[df["timestamp"] < "2025-01-01 01:00"], epsilon=1.0)
+    with pytest.raises(PrivacyBudgetExceeded):
+        ledger.release(df, epsilon=1.0)
+    assert ledger.spent == {"h1": 1.0, "h2": 1.0}
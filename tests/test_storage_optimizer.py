@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backend.storage_optimizer import (
+    dispatch_battery, optimize_battery_operation, optimize_battery_schedule, plan_battery_dp,
+    simulate_solar_generation, time_of_use_prices,
+)
+
+@pytest.fixture
+def minute_day():
+    # One day at one-minute resolution: ~0.04 kWh loads, well below one 0.1 kWh SOC level
+    rng = np.random.default_rng(0)
+    timestamps = pd.date_range("2025-01-01", periods=1440, freq="min")
+    load = np.abs(rng.normal(0.04, 0.02, len(timestamps)))
+    net = load - simulate_solar_generation(timestamps) / 60
+    return timestamps, load, net, time_of_use_prices(timestamps, 6.0)
+
+def grid_cost(net, soc, prices, initial_soc=0.0):
+    return float((prices * np.maximum(0.0, net + np.diff(soc, prepend=initial_soc))).sum())
+
+def test_dp_never_costs_more_than_greedy(minute_day):
+    _, _, net, prices = minute_day
+    greedy, _ = dispatch_battery(net, 10, 2, 2, 0)
+    optimal = plan_battery_dp(net, prices, 10, 2, 2, 0)
+    assert grid_cost(net, optimal, prices) <= grid_cost(net, greedy, prices)
+    assert grid_cost(net, optimal, prices) < grid_cost(net, np.zeros_like(net), prices)
+
+def test_dp_respects_capacity_and_rates(minute_day):
+    _, _, net, prices = minute_day
+    soc = plan_battery_dp(net, prices, capacity_kwh=5, charge_rate=0.5, discharge_rate=0.25, initial_soc=2)
+    change = np.diff(soc, prepend=2.0)
+    assert soc.min() >= -1e-9 and soc.max() <= 5 + 1e-9
+    assert change.max() <= 0.5 + 1e-9 and change.min() >= -0.25 - 1e-9
+
+def test_dp_matches_linear_program(minute_day):
+    linprog = pytest.importorskip("scipy.optimize").linprog
+    _, _, net, prices = minute_day
+    net, prices = net[:240], prices[:240]
+    n = len(net)
+    cumulative = np.tril(np.ones((n, n)))
+    # Variables: per-step SOC change, then grid import
+    result = linprog(
+        np.r_[np.zeros(n), prices],
+        A_ub=np.block([[np.eye(n), -np.eye(n)], [cumulative, np.zeros((n, n))], [-cumulative, np.zeros((n, n))]]),
+        b_ub=np.r_[-net, np.full(n, 1.0), np.zeros(n)],
+        bounds=[(-0.5, 0.5)] * n + [(0, None)] * n,
+        method="highs",
+    )
+    soc = plan_battery_dp(net, prices, capacity_kwh=1.0, charge_rate=0.5, discharge_rate=0.5)
+    assert grid_cost(net, soc, prices) == pytest.approx(result.fun, rel=1e-6)
+
+def test_savings_mean_avoided_bill_for_both_schedulers(minute_day):
+    timestamps, load, _, prices = minute_day
+    df = pd.DataFrame({"timestamp": timestamps, "energy_kwh": load})
+    for optimize in (optimize_battery_operation, optimize_battery_schedule):
+        result = optimize(df, prices=prices)
+        net = result["net_usage_kwh"].to_numpy()
+        no_battery = grid_cost(net, np.zeros_like(net), prices)
+        assert result["savings_rs"].sum() == pytest.approx(no_battery - grid_cost(net, result["soc_kwh"].to_numpy(), prices))
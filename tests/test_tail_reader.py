@@ -0,0 +1,53 @@
+import gc
+import os
+import subprocess
+import sys
+import pandas as pd
+from backend.tail_reader import CsvTailReader
+
+def write_rows(path, start, count):
+    rows = pd.DataFrame({"timestamp": pd.date_range("2025-01-01", periods=count, freq="min") + pd.Timedelta(minutes=start),
+                         "home_id": "h1", "energy_kwh": range(start, start + count)})
+    rows.to_csv(path, mode="a", header=not os.path.exists(path), index=False)
+
+def test_history_includes_spilled_rows(tmp_path):
+    path = tmp_path / "usage.csv"
+    reader = CsvTailReader(str(path), max_rows=10, spill_dir=str(tmp_path / "spill"))
+    for start in range(0, 50, 10):
+        write_rows(path, start, 10)
+        reader.read()
+    assert len(reader.read()) == 10
+    assert reader.history()["energy_kwh"].tolist() == list(range(50))
+
+def test_spill_dir_is_removed_with_the_reader(tmp_path):
+    path = tmp_path / "usage.csv"
+    write_rows(path, 0, 50)
+    reader = CsvTailReader(str(path), max_rows=10, spill_dir=str(tmp_path / "spill"))
+    reader.read()
+    spill_dir = reader.spill_dir
+    assert os.listdir(spill_dir)
+    del reader
+    gc.collect()
+    assert not os.path.exists(spill_dir)
+
+def test_spill_dir_is_removed_at_exit(tmp_path):
+    path = tmp_path / "usage.csv"
+    write_rows(path, 0, 50)
+    script = ("import sys; from backend.tail_reader import get_reader; "
+              "r = get_reader(sys.argv[1], max_rows=10, spill_dir=sys.argv[2]); r.read(); print(r.spill_dir)")
+    out = subprocess.run([sys.executable, "-c", script, str(path), str(tmp_path / "spill")],
+                         capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.dirname(__file__)))
+    assert not os.path.exists(out.stdout.strip())
+
+def test_stale_spill_dirs_are_removed_on_startup(tmp_path):
+    path = tmp_path / "usage.csv"
+    write_rows(path, 0, 5)
+    reader = CsvTailReader(str(path), spill_dir=str(tmp_path / "spill"))
+    prefix = reader.spill_dir[:-len(str(os.getpid()))]
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    stale, live = f"{prefix}{dead.pid}", f"{prefix}{os.getppid()}"
+    for directory in (stale, live):
+        os.makedirs(directory)
+    CsvTailReader(str(path), spill_dir=str(tmp_path / "spill"))
+    assert not os.path.exists(stale) and os.path.exists(live)